@@ -0,0 +1,245 @@
+"""Reproducible inference benchmark for utils/emotion.
+
+    python -m benchmarks.emotion_benchmark --output results.json
+    python -m benchmarks.emotion_benchmark --save-baseline benchmarks/baseline.json
+    python -m benchmarks.emotion_benchmark --baseline benchmarks/baseline.json
+
+Scores seeded synthetic notes of controlled token lengths and sweeps note
+length, batch size and torch thread count. For every configuration it
+reports p50/p95 batch latency, throughput and peak RSS, plus the model load
+time and the peak RSS of the whole run. Per-configuration peak RSS needs
+Linux, where the peak can be reset between configurations; elsewhere it is
+reported as null. The emotion cache and inference server are bypassed so every run
+measures the model. With --baseline, any configuration whose p95 latency or
+throughput is worse than the stored run by more than --tolerance is flagged
+and the exit code is 1.
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+DEFAULT_LENGTHS = (32, 128, 512, 2048)
+DEFAULT_BATCH_SIZES = (1, 8, 32)
+DEFAULT_THREADS = (1, 4)
+DEFAULT_NOTES = 64
+DEFAULT_TOLERANCE = 0.15
+
+SYNTHETIC_SENTENCES = [
+    "I have been feeling anxious about work all week.",
+    "We talked about the argument with my sister.",
+    "Sleep has been better since we changed the routine.",
+    "I get angry when I think about how he treated me.",
+    "Some days I just feel numb and tired.",
+    "I was surprised by how calm I felt at the meeting.",
+    "The panic attacks came back on Tuesday night.",
+    "I'm proud that I went to the gym three times.",
+    "It still hurts when I drive past the old house.",
+    "My manager gave me good feedback for once.",
+]
+
+
+def make_synthetic_notes(tokenizer, target_tokens, count, seed=0):
+    """Build `count` notes of roughly `target_tokens` tokens from a fixed sentence pool."""
+    rng = random.Random(f"{seed}-{target_tokens}")
+    notes = []
+    for _ in range(count):
+        sentences = []
+        tokens = 0
+        while tokens < target_tokens:
+            sentence = rng.choice(SYNTHETIC_SENTENCES)
+            sentences.append(sentence)
+            tokens += len(tokenizer(sentence, add_special_tokens=False)['input_ids'])
+        notes.append(" ".join(sentences))
+    return notes
+
+
+def _percentile(values, percentile):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percentile / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _process_peak_rss_mb():
+    """Peak resident memory of this process since it started, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _reset_peak_rss():
+    """Restart the peak RSS measurement from the current RSS.
+
+    Returns False where that isn't supported, in which case _peak_rss_mb
+    can't be attributed to what ran since the call.
+    """
+    # Writing 5 to clear_refs resets the VmHWM high-water mark (Linux 4.0+)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Peak resident memory since the last _reset_peak_rss, in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _process_peak_rss_mb()
+
+
+def _set_threads(threads):
+    """Set the torch intra-op thread count, if torch is in use."""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(lengths=DEFAULT_LENGTHS, batch_sizes=DEFAULT_BATCH_SIZES, threads=DEFAULT_THREADS,
+                  notes_per_config=DEFAULT_NOTES, seed=0):
+    """Run the sweep and return the results as a dict."""
+    from utils import emotion
+
+    start = time.perf_counter()
+    classifier = emotion.load_emotion_classifier()
+    model_load_seconds = time.perf_counter() - start
+    if classifier is None:
+        raise SystemExit("Could not load the emotion model.")
+
+    tokenizer = emotion.load_emotion_tokenizer()
+    # Warm up once so the first configuration doesn't absorb one-off setup costs
+    emotion.analyze_notes_chunked(make_synthetic_notes(tokenizer, 32, 2, seed),
+                                  use_cache=False, use_server=False)
+
+    results = []
+    for length in lengths:
+        notes = make_synthetic_notes(tokenizer, length, notes_per_config, seed)
+        for thread_count in threads:
+            _set_threads(thread_count)
+            for batch_size in batch_sizes:
+                latencies = []
+                rss_reset = _reset_peak_rss()
+                run_start = time.perf_counter()
+                for offset in range(0, len(notes), batch_size):
+                    call_start = time.perf_counter()
+                    emotion.analyze_notes_chunked(notes[offset:offset + batch_size], batch_size=batch_size,
+                                                  use_cache=False, use_server=False)
+                    latencies.append(time.perf_counter() - call_start)
+                elapsed = time.perf_counter() - run_start
+
+                result = {
+                    'length_tokens': length,
+                    'batch_size': batch_size,
+                    'threads': thread_count,
+                    'notes': len(notes),
+                    'p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+                    'p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+                    'throughput_notes_per_s': round(len(notes) / elapsed, 2),
+                    'peak_rss_mb': round(_peak_rss_mb(), 1) if rss_reset else None,
+                }
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'settings': emotion.pipeline_settings(),
+            'seed': seed,
+        },
+        'model_load_seconds': round(model_load_seconds, 3),
+        'process_peak_rss_mb': round(_process_peak_rss_mb(), 1),
+        'results': results,
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a list of regressions against a stored baseline report."""
+    def key(result):
+        return result['length_tokens'], result['batch_size'], result['threads']
+
+    reference = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        previous = reference.get(key(result))
+        if not previous:
+            continue
+        if result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append({'config': key(result), 'metric': 'p95_ms',
+                                'baseline': previous['p95_ms'], 'current': result['p95_ms']})
+        if result['throughput_notes_per_s'] < previous['throughput_notes_per_s'] * (1 - tolerance):
+            regressions.append({'config': key(result), 'metric': 'throughput_notes_per_s',
+                                'baseline': previous['throughput_notes_per_s'],
+                                'current': result['throughput_notes_per_s']})
+    return regressions
+
+
+def _int_list(value):
+    return tuple(int(item) for item in value.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark emotion inference.")
+    parser.add_argument("--lengths", type=_int_list, default=DEFAULT_LENGTHS, help="Note lengths in tokens, e.g. 32,512")
+    parser.add_argument("--batch-sizes", type=_int_list, default=DEFAULT_BATCH_SIZES, help="Batch sizes to sweep")
+    parser.add_argument("--threads", type=_int_list, default=DEFAULT_THREADS, help="Torch thread counts to sweep")
+    parser.add_argument("--notes", type=int, default=DEFAULT_NOTES, help="Notes scored per configuration")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic notes")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--save-baseline", help="Also store the report as a baseline at this path")
+    parser.add_argument("--baseline", help="Compare against a stored baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a configuration counts as a regression")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.lengths, args.batch_sizes, args.threads, args.notes, args.seed)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare_to_baseline(report, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(output)
+
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            print(f"Regression in {regression['config']}: {regression['metric']} "
+                  f"{regression['baseline']} -> {regression['current']}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark PDF report generation for patients with long histories.
+
+    python -m benchmarks.pdf_benchmark --notes 1000,5000 --output pdf_results.json
+
+Seeds a temporary database with one patient per size, each note scored with
+seeded random emotions, and builds the patient's report three times: with an
+empty chart cache, with the charts already cached, and once more under
+tracemalloc to measure the peak Python memory of a warm build. Reports the
+build times, peak memory, peak RSS of the cold and warm builds (Linux only,
+null elsewhere) and the size of the PDF, plus the peak RSS of the whole run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from benchmarks.emotion_benchmark import (SYNTHETIC_SENTENCES, _git_commit, _int_list, _peak_rss_mb,
+                                          _process_peak_rss_mb, _reset_peak_rss)
+
+
+DEFAULT_NOTE_COUNTS = (1000, 5000)
+EMOTIONS = ('anger', 'disgust', 'fear', 'joy', 'neutral', 'sadness', 'surprise')
+
+
+def seed_patient(db, therapist_id, note_count, seed=0):
+    """Add a patient with `note_count` scored notes, one every few days, and return its ID."""
+    rng = random.Random(f"{seed}-{note_count}")
+    patient_id = db.add_patient(therapist_id, f"Benchmark Patient {note_count}")
+
+    start = datetime(2015, 1, 1)
+    notes = []
+    for index in range(note_count):
+        scores = [rng.random() for _ in EMOTIONS]
+        total = sum(scores)
+        notes.append({
+            'patient_id': patient_id,
+            'therapist_id': therapist_id,
+            'timestamp': (start + timedelta(days=index * 3)).strftime("%Y-%m-%d %H:%M:%S"),
+            'note_text': " ".join(rng.choice(SYNTHETIC_SENTENCES) for _ in range(rng.randint(3, 12))),
+            'emotions': {emotion: score / total for emotion, score in zip(EMOTIONS, scores)},
+        })
+    for offset in range(0, len(notes), 500):
+        db.import_session_notes(notes[offset:offset + 500])
+    return patient_id
+
+
+def run_benchmark(note_counts=DEFAULT_NOTE_COUNTS, seed=0):
+    """Build each report cold, warm and under tracemalloc, and return the results as a dict."""
+    from utils.chart_cache import ChartCache
+    from utils.database import Database
+    from utils.pdf_report import build_patient_report
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    db = Database(db_path)
+
+    results = []
+    try:
+        for note_count in note_counts:
+            patient_id = seed_patient(db, 1, note_count, seed)
+            chart_cache = ChartCache()
+
+            # Measured over the cold and warm builds only, not the seeding or earlier sizes
+            rss_reset = _reset_peak_rss()
+            start = time.perf_counter()
+            _, pdf = build_patient_report(db, patient_id, 1, chart_cache)
+            cold_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            build_patient_report(db, patient_id, 1, chart_cache)
+            warm_seconds = time.perf_counter() - start
+            peak_rss_mb = round(_peak_rss_mb(), 1) if rss_reset else None
+
+            tracemalloc.start()
+            build_patient_report(db, patient_id, 1, chart_cache)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            result = {
+                'notes': note_count,
+                'cold_seconds': round(cold_seconds, 3),
+                'warm_seconds': round(warm_seconds, 3),
+                'peak_python_mb': round(peak_bytes / (1024 * 1024), 1),
+                'peak_rss_mb': peak_rss_mb,
+                'pdf_kb': round(len(pdf) / 1024, 1),
+            }
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    finally:
+        db.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'seed': seed,
+        },
+        'process_peak_rss_mb': round(_process_peak_rss_mb(), 1),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF report generation.")
+    parser.add_argument("--notes", type=_int_list, default=DEFAULT_NOTE_COUNTS,
+                        help="Notes per patient to benchmark, e.g. 1000,5000")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic notes")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.notes, args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
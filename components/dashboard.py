@@ -1,117 +1,257 @@
-import streamlit as st
-from utils.auth import authentication_required
-import pandas as pd
-
-
-@authentication_required
-def render_dashboard(db):
-    """Render the therapist dashboard with patient management."""
-    st.title(f"Welcome, {st.session_state.user_name}")
-
-    st.markdown("## Your Patients")
-
-    # Get patients for the logged-in therapist
-    patients = db.get_patients(st.session_state.user_id)
-
-    # Display patients in a table
-    if patients:
-        # Convert to DataFrame for easier display
-        df = pd.DataFrame(patients)
-        # Select only relevant columns for display
-        display_cols = ['id', 'name', 'age', 'gender', 'contact']
-        if all(col in df.columns for col in display_cols):
-            df_display = df[display_cols]
-            df_display = df_display.rename(columns={'id': 'Patient ID'})
-
-            # Hide index
-            st.dataframe(df_display.set_index('Patient ID'), use_container_width=True)
-        else:
-            st.error("Patient data columns are missing expected fields.")
-    else:
-        st.info("You don't have any patients yet. Add your first patient below.")
-
-    # Add new patient form
-    st.markdown("### Add New Patient")
-    with st.form("add_patient_form"):
-        col1, col2 = st.columns(2)
-        with col1:
-            name = st.text_input("Patient Name")
-            age = st.number_input("Age", min_value=0, max_value=120, step=1)
-        with col2:
-            gender = st.selectbox("Gender", ["", "Male", "Female", "Non-binary", "Other", "Prefer not to say"])
-            contact = st.text_input("Contact Information (Phone/Email)")
-
-        notes = st.text_area("Initial Notes (Optional)")
-        submit_button = st.form_submit_button("Add Patient")
-
-    if submit_button:
-        if not name:
-            st.error("Patient name is required.")
-        else:
-            # Add the patient to the database
-            patient_id = db.add_patient(
-                st.session_state.user_id,
-                name,
-                age if age > 0 else None,
-                gender if gender else None,
-                contact,
-                notes
-            )
-
-            if patient_id:
-                st.success(f"Patient '{name}' added successfully!")
-                # Refresh the page to show the updated patient list
-                st.rerun()
-            else:
-                st.error("Failed to add patient.")
-
-    # Patient selection for detailed view
-    if patients:
-        st.markdown("### View Patient Records")
-
-        # Create patient selection dropdown
-        patient_options = {p['id']: f"{p['name']} (ID: {p['id']})" for p in patients}
-        selected_patient_id = st.selectbox(
-            "Select a patient to view details",
-            options=list(patient_options.keys()),
-            format_func=lambda x: patient_options[x]
-        )
-
-        if selected_patient_id:
-            view_button = st.button("View Patient Details")
-            if view_button:
-                # Store the selected patient in session state and navigate to patient view
-                st.session_state.selected_patient_id = selected_patient_id
-                st.rerun()
-
-    # Admin section (optional)
-    with st.expander("Admin Tools"):
-        st.markdown("### Delete Patient")
-
-        if patients:
-            patient_to_delete = st.selectbox(
-                "Select patient to delete",
-                options=list(patient_options.keys()),
-                format_func=lambda x: patient_options[x],
-                key="delete_patient_select"
-            )
-
-            if patient_to_delete:
-                delete_button = st.button(
-                    "Delete Patient",
-                    help="This will permanently delete the patient and all their session notes."
-                )
-
-                if delete_button:
-                    confirm = st.checkbox("I understand this action cannot be undone")
-                    if confirm:
-                        if db.delete_patient(patient_to_delete, st.session_state.user_id):
-                            st.success("Patient deleted successfully.")
-                            # If we were viewing this patient, clear the selection
-                            if 'selected_patient_id' in st.session_state and st.session_state.selected_patient_id == patient_to_delete:
-                                del st.session_state.selected_patient_id
-                            st.rerun()
-                        else:
-                            st.error("Failed to delete patient.")
-        else:
-            st.info("No patients to delete.")
+import streamlit as st
+from utils.auth import authentication_required
+from utils.dataframe_cache import get_dataframe_cache
+from components.exports import render_caseload_export
+
+
+@authentication_required
+def render_dashboard(db):
+    """Render the therapist dashboard with patient management."""
+    st.title(f"Welcome, {st.session_state.user_name}")
+
+    st.markdown("## Your Patients")
+
+    # Get patients for the logged-in therapist, with their session overview, in a single query
+    patients = db.get_caseload_summary(st.session_state.user_id)
+
+    # Display patients in a table
+    if patients:
+        import pandas as pd
+
+        # Convert to DataFrame for easier display
+        df = pd.DataFrame(patients)
+        df['last_session'] = pd.to_datetime(df['last_session']).dt.date
+        for col in ['latest_emotion', 'top_emotion']:
+            df[col] = df[col].fillna('').str.capitalize()
+
+        # Select only relevant columns for display
+        display_cols = ['id', 'name', 'age', 'gender', 'contact', 'note_count', 'last_session', 'latest_emotion',
+                        'analyzed_notes', 'top_emotion']
+        if all(col in df.columns for col in display_cols):
+            df_display = df[display_cols]
+            df_display = df_display.rename(columns={'id': 'Patient ID', 'note_count': 'Sessions',
+                                                    'last_session': 'Last Session',
+                                                    'latest_emotion': 'Latest Emotion',
+                                                    'analyzed_notes': 'Analyzed Sessions',
+                                                    'top_emotion': 'Most Frequent Emotion'})
+
+            # Hide index
+            st.dataframe(df_display.set_index('Patient ID'), use_container_width=True)
+        else:
+            st.error("Patient data columns are missing expected fields.")
+    else:
+        st.info("You don't have any patients yet. Add your first patient below.")
+
+    # Add new patient form
+    st.markdown("### Add New Patient")
+    with st.form("add_patient_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            name = st.text_input("Patient Name")
+            age = st.number_input("Age", min_value=0, max_value=120, step=1)
+        with col2:
+            gender = st.selectbox("Gender", ["", "Male", "Female", "Non-binary", "Other", "Prefer not to say"])
+            contact = st.text_input("Contact Information (Phone/Email)")
+
+        notes = st.text_area("Initial Notes (Optional)")
+        submit_button = st.form_submit_button("Add Patient")
+
+    if submit_button:
+        if not name:
+            st.error("Patient name is required.")
+        else:
+            # Add the patient to the database
+            patient_id = db.add_patient(
+                st.session_state.user_id,
+                name,
+                age if age > 0 else None,
+                gender if gender else None,
+                contact,
+                notes
+            )
+
+            if patient_id:
+                st.success(f"Patient '{name}' added successfully!")
+                # Refresh the page to show the updated patient list
+                st.rerun()
+            else:
+                st.error("Failed to add patient.")
+
+    # Patient selection for detailed view
+    if patients:
+        st.markdown("### View Patient Records")
+
+        # Create patient selection dropdown
+        patient_options = {p['id']: f"{p['name']} (ID: {p['id']})" for p in patients}
+        selected_patient_id = st.selectbox(
+            "Select a patient to view details",
+            options=list(patient_options.keys()),
+            format_func=lambda x: patient_options[x]
+        )
+
+        if selected_patient_id:
+            view_button = st.button("View Patient Details")
+            if view_button:
+                # Store the selected patient in session state and navigate to patient view
+                st.session_state.selected_patient_id = selected_patient_id
+                st.rerun()
+
+    # Full-text search across all session notes
+    if patients:
+        render_note_search(db, patients)
+
+    # Bulk import of notes kept in another system
+    if patients:
+        render_note_import(db)
+
+    # Every patient's reports in one download, e.g. for month-end records
+    if patients:
+        render_caseload_export(db)
+
+    # Admin section (optional)
+    with st.expander("Admin Tools"):
+        st.markdown("### Delete Patient")
+
+        if patients:
+            patient_to_delete = st.selectbox(
+                "Select patient to delete",
+                options=list(patient_options.keys()),
+                format_func=lambda x: patient_options[x],
+                key="delete_patient_select"
+            )
+
+            if patient_to_delete:
+                delete_button = st.button(
+                    "Delete Patient",
+                    help="This will permanently delete the patient and all their session notes."
+                )
+
+                if delete_button:
+                    confirm = st.checkbox("I understand this action cannot be undone")
+                    if confirm:
+                        if db.delete_patient(patient_to_delete, st.session_state.user_id):
+                            # Free the patient's cached trend data right away
+                            get_dataframe_cache().invalidate(db.db_path, patient_to_delete, st.session_state.user_id)
+                            st.success("Patient deleted successfully.")
+                            # If we were viewing this patient, clear the selection
+                            if 'selected_patient_id' in st.session_state and st.session_state.selected_patient_id == patient_to_delete:
+                                del st.session_state.selected_patient_id
+                            st.rerun()
+                        else:
+                            st.error("Failed to delete patient.")
+        else:
+            st.info("No patients to delete.")
+
+
+def render_note_search(db, patients):
+    """Render the session note search box and its results."""
+    st.markdown("### Search Session Notes")
+
+    query = st.text_input("Search notes", placeholder="e.g. job loss, sleep, argument with sister")
+
+    with st.expander("Search Filters"):
+        patient_options = {None: "All patients"}
+        patient_options.update({p['id']: f"{p['name']} (ID: {p['id']})" for p in patients})
+        search_patient_id = st.selectbox(
+            "Patient",
+            options=list(patient_options.keys()),
+            format_func=lambda x: patient_options[x],
+            key="search_patient"
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = st.date_input("From", value=None, key="search_start_date")
+        with col2:
+            end_date = st.date_input("To", value=None, key="search_end_date")
+
+        emotion_labels = db.get_therapist_emotion_labels(st.session_state.user_id)
+        dominant_emotion = st.selectbox(
+            "Dominant emotion",
+            options=[""] + emotion_labels,
+            format_func=lambda x: x.capitalize() if x else "Any",
+            key="search_dominant_emotion"
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            score_emotion = st.selectbox(
+                "Emotion score at least",
+                options=[""] + emotion_labels,
+                format_func=lambda x: x.capitalize() if x else "Any emotion",
+                key="search_score_emotion"
+            )
+        with col2:
+            min_score = st.slider("Minimum score", 0.0, 1.0, 0.5, 0.05, key="search_min_score",
+                                  disabled=not score_emotion)
+
+    if not query:
+        return
+
+    results = db.search_notes(
+        st.session_state.user_id,
+        query,
+        patient_id=search_patient_id,
+        start_date=start_date,
+        end_date=end_date,
+        dominant_emotion=dominant_emotion or None,
+        emotion=score_emotion or None,
+        min_score=min_score if score_emotion else None
+    )
+
+    if not results:
+        st.info("No session notes match your search. Archived notes are not searched.")
+        return
+
+    st.caption(f"{len(results)} matching note(s), best matches first. Archived notes are not searched.")
+    for result in results:
+        with st.container(border=True):
+            emotion_text = ""
+            if result['dominant_emotion']:
+                emotion_text = f" - {result['dominant_emotion'].capitalize()} ({result['dominant_score']:.2f})"
+            st.markdown(f"**{result['patient_name']}** - {result['timestamp'].split()[0]}{emotion_text}")
+            st.markdown(result['snippet'])
+
+            if st.button("Open Patient", key=f"search_open_{result['id']}"):
+                st.session_state.selected_patient_id = result['patient_id']
+                st.rerun()
+
+
+def render_note_import(db):
+    """Render the bulk import of session notes from a CSV or JSONL file."""
+    with st.expander("Import Session Notes"):
+        st.write("Upload a CSV or JSONL file with one note per row and the columns "
+                 "`patient` (name) or `patient_id`, `timestamp` (e.g. 2024-03-01 14:30) and `text`.")
+
+        uploaded_file = st.file_uploader("Notes file", type=["csv", "jsonl"], key="import_notes_file")
+        create_patients = st.checkbox("Create patients that don't exist yet", key="import_create_patients")
+
+        if uploaded_file and st.button("Import Notes"):
+            from utils.bulk_import import import_notes, errors_to_csv, detect_format
+
+            progress = st.progress(0.0, text="Importing notes...")
+
+            def report(summary):
+                # The file is streamed, so progress is measured by how much of it has been read
+                fraction = min(uploaded_file.tell() / uploaded_file.size, 1.0) if uploaded_file.size else 1.0
+                progress.progress(fraction, text=f"Imported {summary['imported']} of {summary['rows']} rows read...")
+
+            summary = import_notes(db, st.session_state.user_id, uploaded_file, detect_format(uploaded_file.name),
+                                   create_patients=create_patients, progress_callback=report)
+            progress.progress(1.0, text="Import finished.")
+
+            st.success(f"Imported {summary['imported']} of {summary['rows']} notes.")
+            if summary['queued']:
+                st.info(f"{summary['queued']} notes could not be analyzed now and were queued for background analysis.")
+                from utils.scoring_worker import start_scoring_worker
+                start_scoring_worker(db.db_path).notify()
+
+            if summary['errors']:
+                st.warning(f"{len(summary['errors'])} rows could not be imported.")
+                st.dataframe(summary['errors'], use_container_width=True)
+                st.download_button(
+                    label="Download Error Report",
+                    data=errors_to_csv(summary['errors']),
+                    file_name="import_errors.csv",
+                    mime="text/csv"
+                )
@@ -1,187 +1,254 @@
-import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
-from utils.auth import authentication_required
-from utils.emotion import analyze_emotions, plot_emotion_bar_chart, plot_emotion_trends
-
-
-@authentication_required
-def render_patient_view(db):
-    """Render the detailed view for a selected patient."""
-    # Check if a patient is selected
-    if 'selected_patient_id' not in st.session_state:
-        st.error("No patient selected.")
-        return
-
-    patient_id = st.session_state.selected_patient_id
-    therapist_id = st.session_state.user_id
-
-    # Get patient data
-    patient = db.get_patient(patient_id, therapist_id)
-    if not patient:
-        st.error("Patient not found.")
-        return
-
-    # Display patient header
-    st.title(f"Patient: {patient['name']}")
-
-    # Patient info section
-    with st.expander("Patient Information", expanded=True):
-        col1, col2 = st.columns(2)
-        with col1:
-            st.write(f"**Age:** {patient['age'] if patient['age'] else 'Not provided'}")
-            st.write(f"**Gender:** {patient['gender'] if patient['gender'] else 'Not provided'}")
-        with col2:
-            st.write(f"**Contact:** {patient['contact'] if patient['contact'] else 'Not provided'}")
-            st.write(f"**Patient since:** {patient['created_at'].split()[0] if 'created_at' in patient else 'Unknown'}")
-
-        if patient.get('notes'):
-            st.write("**Initial Notes:**")
-            st.write(patient['notes'])
-
-    # Back to dashboard button
-    if st.button("Back to Dashboard"):
-        if 'selected_patient_id' in st.session_state:
-            del st.session_state.selected_patient_id
-        st.rerun()
-
-    # Get session notes for this patient
-    session_notes = db.get_session_notes(patient_id, therapist_id)
-
-    # Create tabs for different views
-    tab1, tab2 = st.tabs(["Session Notes", "Emotional Trends"])
-
-    # Tab 1: Session Notes
-    with tab1:
-        st.header("Session Notes")
-
-        # Form for adding new session notes
-        with st.form("add_session_note"):
-            st.subheader("Add New Session Note")
-            note_text = st.text_area("Session Notes", height=150)
-            submitted = st.form_submit_button("Save & Analyze")
-
-            if submitted:
-                if not note_text:
-                    st.error("Please enter session notes.")
-                else:
-                    # Analyze emotions in the text
-                    emotions = analyze_emotions(note_text)
-
-                    if emotions:
-                        # Save note with emotion analysis
-                        note_id = db.add_session_note(patient_id, therapist_id, note_text, emotions)
-
-                        if note_id:
-                            st.success("Session note saved successfully!")
-
-                            # Display emotion analysis
-                            st.subheader("Emotion Analysis")
-                            fig = plot_emotion_bar_chart(emotions)
-                            if fig:
-                                st.pyplot(fig)
-
-                            # Refresh to update the notes list
-                            st.rerun()
-                        else:
-                            st.error("Failed to save session note.")
-                    else:
-                        st.error("Failed to analyze emotions. Please try again.")
-
-        # Display existing session notes
-        if session_notes:
-            st.subheader("Previous Session Notes")
-
-            for i, note in enumerate(session_notes):
-                with st.expander(f"Session: {note['timestamp'].split()[0]} at {note['timestamp'].split()[1]}",
-                                 expanded=i == 0):
-                    st.write(note['note_text'])
-
-                    # Find dominant emotion
-                    emotions = note['emotions']
-                    dominant_emotion = max(emotions, key=lambda x: emotions[x])
-                    dominant_score = emotions[dominant_emotion]
-
-                    st.write(
-                        f"**Primary emotion detected:** {dominant_emotion.capitalize()} (Score: {dominant_score:.2f})")
-
-                    # Show emotion chart
-                with st.expander("View Full Emotion Analysis"):
-                    fig = plot_emotion_bar_chart(emotions)
-                    if fig:
-                        st.pyplot(fig)
-        else:
-            st.info("No session notes yet. Add your first note above.")
-
-    # Tab 2: Emotional Trends
-    with tab2:
-        st.header("Emotional Trends Analysis")
-
-        if not session_notes:
-            st.info("No session data available for trend analysis. Add session notes to see trends.")
-        else:
-            # Get emotion data as DataFrame
-            df = db.get_emotions_dataframe(patient_id, therapist_id)
-
-            if not df.empty:
-                # Distribution of dominant emotions
-                st.subheader("Distribution of Dominant Emotions")
-                fig1 = plot_emotion_trends(df, emotion_type='dominant')
-                if fig1:
-                    st.pyplot(fig1)
-
-                # Line charts for specific emotions over time
-                st.subheader("Emotion Trends Over Time")
-
-                # Get list of emotions
-                emotion_columns = [col for col in df.columns if col not in ['timestamp', 'dominant_emotion']]
-
-                if emotion_columns:
-                    selected_emotion = st.selectbox(
-                        "Select emotion to view trend:",
-                        options=emotion_columns
-                    )
-
-                    if selected_emotion:
-                        fig2 = plot_emotion_trends(df, emotion_type=selected_emotion)
-                        if fig2:
-                            st.pyplot(fig2)
-
-                        # Summary statistics
-                        st.subheader("Summary Statistics")
-                        avg_score = df[selected_emotion].mean()
-                        max_score = df[selected_emotion].max()
-                        min_score = df[selected_emotion].min()
-
-                        col1, col2, col3 = st.columns(3)
-                        col1.metric("Average Score", f"{avg_score:.2f}")
-                        col2.metric("Maximum Score", f"{max_score:.2f}")
-                        col3.metric("Minimum Score", f"{min_score:.2f}")
-
-                        # Show recent trend direction
-                        if len(df) >= 2:
-                            recent_trend = df[selected_emotion].iloc[-1] - df[selected_emotion].iloc[-2]
-                            trend_direction = "increasing" if recent_trend > 0 else "decreasing" if recent_trend < 0 else "stable"
-                            st.write(f"**Recent trend:** {selected_emotion.capitalize()} is {trend_direction}.")
-            else:
-                st.warning("Error processing emotion data for trends.")
-
-    # Export options
-    st.sidebar.header("Export Options")
-    export_csv = st.sidebar.button("Export to CSV")
-    if export_csv:
-        csv_file = db.export_patient_data_to_csv(patient_id, therapist_id)
-        if csv_file:
-            st.sidebar.success(f"Data exported to {csv_file}")
-
-            # Create a download button
-            with open(csv_file, 'rb') as file:
-                st.sidebar.download_button(
-                    label="Download CSV File",
-                    data=file,
-                    file_name=csv_file,
-                    mime="text/csv"
-                )
-        else:
-            st.sidebar.error("Failed to export data or no data to export.")
+import streamlit as st
+from utils.auth import authentication_required
+from utils.database import Database
+from utils.emotion import plot_emotion_bar_chart, plot_emotion_trends, plot_dominant_emotion_counts, plot_sentence_timeline
+from utils.chart_cache import get_chart_cache, render_png
+from utils.scoring_worker import start_scoring_worker
+from utils.dataframe_cache import get_dataframe_cache
+from utils.config import SCORING_POLL_SECONDS, SESSION_NOTES_PAGE_SIZE
+
+
+@st.fragment(run_every=SCORING_POLL_SECONDS)
+def watch_pending_analysis(db_path, patient_id, therapist_id):
+    """Poll for queued notes of a patient and rerun the page once they are all analyzed."""
+    # Fragment reruns can overlap the main script run, so take a separate pooled connection
+    db = Database(db_path)
+    pending = db.count_pending_notes(patient_id, therapist_id)
+    db.close()
+
+    if pending:
+        st.caption(f"Analyzing {pending} note(s)... results will appear automatically.")
+    else:
+        st.rerun()
+
+
+@authentication_required
+def render_patient_view(db):
+    """Render the detailed view for a selected patient."""
+    # Check if a patient is selected
+    if 'selected_patient_id' not in st.session_state:
+        st.error("No patient selected.")
+        return
+
+    patient_id = st.session_state.selected_patient_id
+    therapist_id = st.session_state.user_id
+
+    # Get patient data
+    patient = db.get_patient(patient_id, therapist_id)
+    if not patient:
+        st.error("Patient not found.")
+        return
+
+    # Display patient header
+    st.title(f"Patient: {patient['name']}")
+
+    # Patient info section
+    with st.expander("Patient Information", expanded=True):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write(f"**Age:** {patient['age'] if patient['age'] else 'Not provided'}")
+            st.write(f"**Gender:** {patient['gender'] if patient['gender'] else 'Not provided'}")
+        with col2:
+            st.write(f"**Contact:** {patient['contact'] if patient['contact'] else 'Not provided'}")
+            st.write(f"**Patient since:** {patient['created_at'].split()[0] if 'created_at' in patient else 'Unknown'}")
+
+        if patient.get('notes'):
+            st.write("**Initial Notes:**")
+            st.write(patient['notes'])
+
+    # Back to dashboard button
+    if st.button("Back to Dashboard"):
+        if 'selected_patient_id' in st.session_state:
+            del st.session_state.selected_patient_id
+        st.rerun()
+
+    # Get session notes for this patient, only as many pages as have been asked for
+    pages_key = f"note_pages_{patient_id}"
+    if pages_key not in st.session_state:
+        st.session_state[pages_key] = 1
+
+    session_notes = []
+    older_notes_cursor = None
+    for _ in range(st.session_state[pages_key]):
+        page, older_notes_cursor = db.get_session_notes_page(patient_id, therapist_id, SESSION_NOTES_PAGE_SIZE,
+                                                             before=older_notes_cursor)
+        session_notes.extend(page)
+        if older_notes_cursor is None:
+            break
+
+    # Create tabs for different views
+    tab1, tab2 = st.tabs(["Session Notes", "Emotional Trends"])
+
+    # Tab 1: Session Notes
+    with tab1:
+        st.header("Session Notes")
+
+        # Form for adding new session notes
+        with st.form("add_session_note"):
+            st.subheader("Add New Session Note")
+            note_text = st.text_area("Session Notes", height=150)
+            submitted = st.form_submit_button("Save & Analyze")
+
+            if submitted:
+                if not note_text:
+                    st.error("Please enter session notes.")
+                else:
+                    # Save the note right away and let the background worker analyze it
+                    note_id = db.queue_session_note(patient_id, therapist_id, note_text)
+
+                    if note_id:
+                        start_scoring_worker(db.db_path).notify()
+                        st.success("Session note saved! Emotion analysis is running in the background.")
+
+                        # Refresh to update the notes list
+                        st.rerun()
+                    else:
+                        st.error("Failed to save session note.")
+
+        # Display existing session notes
+        if session_notes:
+            st.subheader("Previous Session Notes")
+
+            chart_cache = get_chart_cache()
+            for i, note in enumerate(session_notes):
+                # Tracking the open state lets charts be skipped for collapsed notes
+                expander = st.expander(f"Session: {note['timestamp'].split()[0]} at {note['timestamp'].split()[1]}",
+                                       expanded=i == 0, key=f"note_expander_{note['id']}", on_change="rerun")
+                with expander:
+                    st.write(note['note_text'])
+
+                    emotions = note['emotions']
+                    if note.get('emotion_status') == 'pending':
+                        st.info("Emotion analysis in progress...")
+                        continue
+                    if not emotions:
+                        st.warning("Emotion analysis failed for this note.")
+                        continue
+
+                    # Dominant emotion is stored with the note
+                    dominant_emotion = note['dominant_emotion']
+                    dominant_score = note['dominant_score']
+
+                    st.write(
+                        f"**Primary emotion detected:** {dominant_emotion.capitalize()} (Score: {dominant_score:.2f})")
+
+                    if note.get('emotion_windows'):
+                        st.caption(f"Long note scored across {len(note['emotion_windows'])} overlapping windows.")
+
+                    if not expander.open:
+                        continue
+
+                    # Show emotion chart, plotted once per distinct set of scores
+                    png = chart_cache.get_png('emotion_bar', emotions, plot_emotion_bar_chart)
+                    if png:
+                        st.image(png)
+
+                    # Show how emotions shift over the course of the session
+                    timeline = chart_cache.get_png('sentence_timeline', note.get('sentence_emotions'),
+                                                   plot_sentence_timeline)
+                    if timeline:
+                        st.image(timeline)
+
+            # Load the next page of older notes on request
+            if older_notes_cursor is not None:
+                if st.button("Load Older Notes"):
+                    st.session_state[pages_key] += 1
+                    st.rerun()
+
+            # Keep checking on notes that are still being analyzed
+            if db.count_pending_notes(patient_id, therapist_id):
+                watch_pending_analysis(db.db_path, patient_id, therapist_id)
+
+            if any(note.get('emotion_status') == 'failed' for note in session_notes):
+                if st.button("Retry Failed Analysis"):
+                    db.retry_failed_scoring(patient_id, therapist_id)
+                    start_scoring_worker(db.db_path).notify()
+                    st.rerun()
+        else:
+            st.info("No session notes yet. Add your first note above.")
+
+    # Tab 2: Emotional Trends
+    with tab2:
+        st.header("Emotional Trends Analysis")
+
+        if not session_notes:
+            st.info("No session data available for trend analysis. Add session notes to see trends.")
+        else:
+            # Dominant emotion counts are aggregated in the database
+            dominant_counts = db.get_dominant_emotion_counts(patient_id, therapist_id)
+
+            if dominant_counts:
+                # Distribution of dominant emotions
+                st.subheader("Distribution of Dominant Emotions")
+                png = get_chart_cache().get_png('dominant_counts', dominant_counts, plot_dominant_emotion_counts)
+                if png:
+                    st.image(png)
+
+                # Line charts for specific emotions over time
+                st.subheader("Emotion Trends Over Time")
+
+                # Get list of emotions
+                emotion_columns = db.get_emotion_labels(patient_id, therapist_id)
+
+                if emotion_columns:
+                    selected_emotion = st.selectbox(
+                        "Select emotion to view trend:",
+                        options=emotion_columns
+                    )
+
+                    trend_period = st.radio("Show trend per:", ["Session", "Day", "Week"], horizontal=True)
+
+                    if selected_emotion:
+                        if trend_period == "Session":
+                            # Cached across reruns; only newly scored notes are read from the database
+                            df = get_dataframe_cache().get_dataframe(db, patient_id, therapist_id)
+                        else:
+                            # Daily and weekly averages come from the rollup buckets
+                            import pandas as pd
+
+                            buckets = db.get_emotion_buckets(patient_id, therapist_id, selected_emotion,
+                                                             period=trend_period.lower())
+                            df = pd.DataFrame({
+                                'timestamp': pd.to_datetime([bucket['bucket'] for bucket in buckets]),
+                                selected_emotion: [bucket['average'] for bucket in buckets]
+                            })
+                        fig2 = plot_emotion_trends(df, emotion_type=selected_emotion)
+                        if fig2:
+                            # Rendered to an image so the figure is closed straight away
+                            st.image(render_png(fig2))
+
+                        # Summary statistics
+                        st.subheader("Summary Statistics")
+                        summary = db.get_emotion_summary(patient_id, therapist_id, selected_emotion)
+
+                        col1, col2, col3 = st.columns(3)
+                        col1.metric("Average Score", f"{summary['average']:.2f}")
+                        col2.metric("Maximum Score", f"{summary['maximum']:.2f}")
+                        col3.metric("Minimum Score", f"{summary['minimum']:.2f}")
+
+                        # Show recent trend direction
+                        if summary['previous'] is not None:
+                            recent_trend = summary['latest'] - summary['previous']
+                            trend_direction = "increasing" if recent_trend > 0 else "decreasing" if recent_trend < 0 else "stable"
+                            st.write(f"**Recent trend:** {selected_emotion.capitalize()} is {trend_direction}.")
+            else:
+                st.warning("Error processing emotion data for trends.")
+
+    # Export options
+    st.sidebar.header("Export Options")
+    export_csv = st.sidebar.button("Export to CSV")
+    if export_csv:
+        csv_export = db.export_patient_data_to_csv(patient_id, therapist_id)
+        if csv_export:
+            filename, data = csv_export
+            st.sidebar.success(f"Export ready: {filename}")
+
+            # Create a download button
+            st.sidebar.download_button(
+                label="Download CSV File",
+                data=data,
+                file_name=filename,
+                mime="text/csv"
+            )
+        else:
+            st.sidebar.error("Failed to export data or no data to export.")
@@ -0,0 +1,33 @@
+"""Move old session notes to the archive database.
+
+    python -m utils.archive --days 365
+
+Analyzed notes older than the given age are copied to "<db name>_archive.db"
+with their text compressed, then removed from the main database, keeping
+the tables every page load reads small. The patient view and exports read
+archived notes transparently, attaching the archive only for patients that
+have some, except for the dashboard search, which only covers notes in the
+main database. Safe to run repeatedly, e.g. nightly from cron.
+"""
+import argparse
+from utils.config import ARCHIVE_AFTER_DAYS
+from utils.database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old session notes to the archive database.")
+    parser.add_argument("--db", default="database.db", help="Path to the SQLite database")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"Archive notes older than this many days (default {ARCHIVE_AFTER_DAYS})")
+    parser.add_argument("--batch-size", type=int, default=500, help="Notes moved per transaction")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    moved = db.archive_old_notes(args.days, args.batch_size)
+    db.close()
+
+    print(f"Archived {moved} notes older than {args.days} days to {db.archive_path}")
+
+
+if __name__ == "__main__":
+    main()
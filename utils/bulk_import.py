@@ -0,0 +1,228 @@
+"""Bulk import of historical session notes from CSV or JSONL.
+
+    python -m utils.bulk_import notes.csv --therapist jsmith --errors import_errors.csv
+
+Every row needs a patient (``patient_id`` or ``patient`` name), a
+``timestamp`` and the note ``text``. The file is streamed, valid rows are
+scored in batches and each chunk is written in one transaction. Rows that
+can't be imported are collected in an error report with their row number
+instead of stopping the import.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from utils.database import Database
+
+
+DEFAULT_CHUNK_SIZE = 64
+TEXT_COLUMNS = ('text', 'note_text', 'note')
+
+
+def iter_rows(stream, file_format):
+    """Yield (row number, row dict, error) for each record of a binary CSV or JSONL stream.
+
+    Rows are numbered from 1, not counting the CSV header. The stream is
+    read incrementally and left open for the caller.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == 'csv':
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                yield number, row, None
+        else:
+            number = 0
+            for line in text:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield number, None, f"Invalid JSON: {e}"
+                    continue
+                if not isinstance(row, dict):
+                    yield number, None, "Expected a JSON object"
+                    continue
+                yield number, row, None
+    finally:
+        # Don't close the caller's stream along with the wrapper
+        text.detach()
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 date or date-time into the database's "YYYY-MM-DD HH:MM:SS" UTC format."""
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid timestamp '{value}', expected e.g. 2024-03-01 or 2024-03-01 14:30")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _resolve_patient(db, therapist_id, row, patients_by_id, patients_by_name, create_patients):
+    """Return the patient ID a row refers to, raising ValueError if there is none."""
+    patient_id = str(row.get('patient_id') or '').strip()
+    if patient_id:
+        if not patient_id.isdigit() or int(patient_id) not in patients_by_id:
+            raise ValueError(f"Unknown patient ID '{patient_id}'")
+        return int(patient_id)
+
+    name = str(row.get('patient') or '').strip()
+    if not name:
+        raise ValueError("Missing patient or patient_id")
+    if name.lower() not in patients_by_name:
+        if not create_patients:
+            raise ValueError(f"Unknown patient '{name}'")
+        patients_by_name[name.lower()] = db.add_patient(therapist_id, name)
+        patients_by_id.add(patients_by_name[name.lower()])
+    return patients_by_name[name.lower()]
+
+
+def _score_notes(notes, batch_size):
+    """Add emotion scores to parsed notes. Notes that fail to score are left for the background worker."""
+    from utils.emotion import analyze_notes_chunked, analyze_sentences_batch
+
+    texts = [note['note_text'] for note in notes]
+    try:
+        results = analyze_notes_chunked(texts, batch_size=batch_size)
+        sentences = analyze_sentences_batch(texts, batch_size=batch_size)
+    except Exception:
+        results = [({}, []) for _ in notes]
+        sentences = [None for _ in notes]
+
+    for note, (emotions, windows), sentence_emotions in zip(notes, results, sentences):
+        note['emotions'] = emotions
+        note['emotion_windows'] = windows if len(windows) > 1 else None
+        note['sentence_emotions'] = sentence_emotions if emotions else None
+
+
+def import_notes(db, therapist_id, stream, file_format, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=16,
+                 create_patients=False, progress_callback=None):
+    """Import session notes from a CSV or JSONL stream for one therapist.
+
+    Args:
+        db: Database instance
+        therapist_id: ID of the therapist the notes belong to
+        stream: Binary file-like object
+        file_format: 'csv' or 'jsonl'
+        chunk_size: Notes scored and written per transaction
+        batch_size: Texts per model forward pass
+        create_patients: Create patients named in the file that don't exist yet
+        progress_callback: Called with the summary dict after every chunk
+
+    Returns:
+        Summary dict with the number of rows read, notes imported, notes
+        queued for background analysis and a list of {'row', 'error'} dicts
+    """
+    patients = db.get_patients(therapist_id)
+    patients_by_id = {patient['id'] for patient in patients}
+    patients_by_name = {patient['name'].strip().lower(): patient['id'] for patient in patients}
+
+    summary = {'rows': 0, 'imported': 0, 'queued': 0, 'errors': []}
+    chunk = []
+
+    for number, row, error in iter_rows(stream, file_format):
+        summary['rows'] += 1
+        if error:
+            summary['errors'].append({'row': number, 'error': error})
+            continue
+
+        try:
+            text = next((str(row[column]).strip() for column in TEXT_COLUMNS if row.get(column)), '')
+            if not text:
+                raise ValueError("Missing note text")
+            if not row.get('timestamp'):
+                raise ValueError("Missing timestamp")
+            timestamp = parse_timestamp(row['timestamp'])
+            patient_id = _resolve_patient(db, therapist_id, row, patients_by_id, patients_by_name, create_patients)
+        except ValueError as e:
+            summary['errors'].append({'row': number, 'error': str(e)})
+            continue
+
+        chunk.append({'row': number, 'patient_id': patient_id, 'therapist_id': therapist_id,
+                      'timestamp': timestamp, 'note_text': text})
+        if len(chunk) >= chunk_size:
+            _write_chunk(db, chunk, batch_size, summary)
+            chunk = []
+            if progress_callback:
+                progress_callback(summary)
+
+    if chunk:
+        _write_chunk(db, chunk, batch_size, summary)
+    if progress_callback:
+        progress_callback(summary)
+
+    return summary
+
+
+def _write_chunk(db, chunk, batch_size, summary):
+    """Score one chunk and write it in a single transaction."""
+    _score_notes(chunk, batch_size)
+    try:
+        db.import_session_notes(chunk)
+    except Exception as e:
+        summary['errors'].extend({'row': note['row'], 'error': f"Could not be saved: {e}"} for note in chunk)
+        return
+
+    queued = sum(1 for note in chunk if not note['emotions'])
+    summary['imported'] += len(chunk)
+    summary['queued'] += queued
+
+
+def errors_to_csv(errors):
+    """Format an error report as CSV text."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=['row', 'error'])
+    writer.writeheader()
+    writer.writerows(errors)
+    return output.getvalue()
+
+
+def detect_format(filename):
+    """Guess 'csv' or 'jsonl' from a file name."""
+    return 'jsonl' if os.path.splitext(filename)[1].lower() in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import historical session notes from CSV or JSONL.")
+    parser.add_argument("file", help="CSV or JSONL file with patient/patient_id, timestamp and text columns")
+    parser.add_argument("--therapist", required=True, help="Username of the therapist the notes belong to")
+    parser.add_argument("--db", default="database.db", help="Path to the SQLite database")
+    parser.add_argument("--format", choices=['csv', 'jsonl'], help="File format; guessed from the extension by default")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Notes written per transaction")
+    parser.add_argument("--batch-size", type=int, default=16, help="Texts per model forward pass")
+    parser.add_argument("--create-patients", action="store_true", help="Create patients that don't exist yet")
+    parser.add_argument("--errors", help="Write the per-row error report to this CSV file")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    therapist = db.get_therapist_by_username(args.therapist)
+    if not therapist:
+        raise SystemExit(f"Unknown therapist '{args.therapist}'")
+
+    def report(summary):
+        print(f"Read {summary['rows']} rows: {summary['imported']} imported, "
+              f"{len(summary['errors'])} errors")
+
+    with open(args.file, 'rb') as f:
+        summary = import_notes(db, therapist['id'], f, args.format or detect_format(args.file),
+                               args.chunk_size, args.batch_size, args.create_patients, report)
+    db.close()
+
+    if summary['queued']:
+        print(f"{summary['queued']} notes could not be scored now and were queued for background analysis.")
+    if args.errors and summary['errors']:
+        with open(args.errors, 'w', newline='') as f:
+            f.write(errors_to_csv(summary['errors']))
+        print(f"Error report written to {args.errors}")
+    if summary['errors']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Export every patient of a therapist as one ZIP of CSV and PDF reports.
+
+    python -m utils.caseload_export --therapist jsmith --output caseload.zip --workers 4
+
+Reports are rendered across a process pool and written into the ZIP as they
+finish, in patient order. Only a bounded number of patients is in flight at
+a time and each report is compressed into the archive before the next one is
+collected, so memory stays flat however large the caseload is.
+"""
+import argparse
+import multiprocessing
+import zipfile
+from collections import deque
+from utils.config import CASELOAD_EXPORT_WORKERS
+from utils.database import Database
+
+
+FORMATS = ('csv', 'pdf')
+
+# Set in each worker process by _init_worker
+_worker_db = None
+_worker_chart_cache = None
+
+
+def _init_worker(db_path):
+    """Open one database connection and chart cache per worker process."""
+    global _worker_db, _worker_chart_cache
+    from utils.chart_cache import ChartCache
+
+    _worker_db = Database(db_path)
+    _worker_chart_cache = ChartCache()
+
+
+def _render_patient(patient_id, therapist_id, formats):
+    """Render one patient's reports. Runs in a worker process.
+
+    Returns a list of (name in the archive, file contents) pairs; empty if the
+    patient has nothing to export.
+    """
+    patient = _worker_db.get_patient(patient_id, therapist_id)
+    if not patient:
+        return []
+
+    prefix = "".join([c if c.isalnum() else "_" for c in patient['name']]) + f"_{patient_id}"
+    files = []
+    if 'csv' in formats:
+        csv_export = _worker_db.export_patient_data_to_csv(patient_id, therapist_id)
+        if csv_export:
+            files.append((f"{prefix}_records.csv", csv_export[1].getvalue()))
+    if 'pdf' in formats:
+        from utils.pdf_report import build_patient_report
+
+        report = build_patient_report(_worker_db, patient_id, therapist_id, _worker_chart_cache)
+        if report:
+            files.append((f"{prefix}_report.pdf", report[1]))
+    return files
+
+
+def export_caseload(db_path, therapist_id, output, formats=FORMATS, workers=CASELOAD_EXPORT_WORKERS,
+                    progress_callback=None):
+    """Write the reports of all of a therapist's patients into a ZIP archive.
+
+    Args:
+        db_path: Path to the SQLite database
+        therapist_id: ID of the therapist whose caseload is exported
+        output: Path or writable binary file object for the ZIP
+        formats: Any of 'csv' and 'pdf'
+        workers: Number of rendering processes
+        progress_callback: Called with (patients done, total patients) after each patient
+
+    Returns:
+        Summary dict with the number of patients, files written and the
+        patients that had nothing to export
+    """
+    db = Database(db_path)
+    patients = db.get_patients(therapist_id)
+    db.close()
+
+    summary = {'patients': len(patients), 'files': 0, 'skipped': []}
+    if progress_callback:
+        progress_callback(0, len(patients))
+
+    # Spawn keeps the workers free of the parent's open SQLite connections
+    context = multiprocessing.get_context("spawn")
+    done = 0
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive, \
+            context.Pool(workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+        # At most two patients per worker are rendered ahead of the one being written
+        in_flight = deque()
+        for patient in patients:
+            in_flight.append((patient, pool.apply_async(_render_patient, (patient['id'], therapist_id, formats))))
+            if len(in_flight) < workers * 2:
+                continue
+            _write_next(archive, in_flight, summary)
+            done += 1
+            if progress_callback:
+                progress_callback(done, len(patients))
+
+        while in_flight:
+            _write_next(archive, in_flight, summary)
+            done += 1
+            if progress_callback:
+                progress_callback(done, len(patients))
+
+    return summary
+
+
+def _write_next(archive, in_flight, summary):
+    """Wait for the oldest patient in flight and add their reports to the archive."""
+    patient, result = in_flight.popleft()
+    files = result.get()
+
+    if not files:
+        summary['skipped'].append(patient['name'])
+    for name, data in files:
+        archive.writestr(name, data)
+    summary['files'] += len(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every patient of a therapist as a ZIP of reports.")
+    parser.add_argument("--therapist", required=True, help="Username of the therapist")
+    parser.add_argument("--output", required=True, help="Path of the ZIP file to write")
+    parser.add_argument("--db", default="database.db", help="Path to the SQLite database")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated report formats: csv, pdf")
+    parser.add_argument("--workers", type=int, default=CASELOAD_EXPORT_WORKERS, help="Number of rendering processes")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    therapist = db.get_therapist_by_username(args.therapist)
+    db.close()
+    if not therapist:
+        raise SystemExit(f"Unknown therapist '{args.therapist}'")
+
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise SystemExit(f"Unknown format(s): {', '.join(sorted(unknown))}")
+
+    def report(done, total):
+        print(f"Exported {done} of {total} patients")
+
+    summary = export_caseload(args.db, therapist['id'], args.output, formats, args.workers, report)
+    print(f"Wrote {summary['files']} files for {summary['patients']} patients to {args.output}")
+    if summary['skipped']:
+        print(f"No session notes to export for: {', '.join(summary['skipped'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+import streamlit as st
+from utils.config import CHART_CACHE_MAX_ENTRIES, CHART_CACHE_MAX_MB
+
+
+def chart_key(kind, data, dpi):
+    """Hash a chart's kind, the data it shows and its resolution into a cache key."""
+    payload = json.dumps([kind, data, dpi], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_png(fig, dpi=100):
+    """Render a matplotlib figure to opaque RGB PNG bytes and close it."""
+    import matplotlib.pyplot as plt
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format='png', dpi=dpi)
+    finally:
+        # Figures stay registered with pyplot, and in memory, until closed
+        plt.close(fig)
+
+    # Charts have a solid background anyway; without the alpha channel the
+    # PDF library embeds the image directly instead of splitting it pixel by pixel
+    buffer.seek(0)
+    output = io.BytesIO()
+    Image.open(buffer).convert('RGB').save(output, format='png')
+    return output.getvalue()
+
+
+class ChartCache:
+    """Process-wide cache of rendered chart PNGs.
+
+    Charts are keyed by a hash of their content, so the same data is only
+    plotted once however many reports or page loads show it. Entries are
+    evicted least recently used first, by count and by size.
+    """
+
+    def __init__(self, max_entries=CHART_CACHE_MAX_ENTRIES, max_mb=CHART_CACHE_MAX_MB):
+        self.max_entries = max_entries
+        self.max_bytes = max_mb * 1024 * 1024
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get_png(self, kind, data, plot, dpi=100):
+        """Get the PNG of a chart, plotting it only if the same chart isn't cached.
+
+        Args:
+            kind: Name of the chart type, part of the cache key
+            data: JSON-serializable data the chart shows, part of the cache key
+            plot: Called with `data` on a miss; returns a matplotlib figure or None
+            dpi: Resolution of the PNG
+
+        Returns:
+            PNG bytes, or None if there is nothing to plot
+        """
+        key = chart_key(kind, data, dpi)
+
+        with self.lock:
+            png = self.entries.get(key)
+            if png is not None:
+                self.entries.move_to_end(key)
+                return png
+
+        fig = plot(data)
+        if fig is None:
+            return None
+        png = render_png(fig, dpi)
+        self._store(key, png)
+        return png
+
+    def _store(self, key, png):
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= len(self.entries.pop(key))
+
+            # An image larger than the whole budget is not worth keeping
+            if len(png) > self.max_bytes:
+                return
+
+            self.entries[key] = png
+            self.total_bytes += len(png)
+
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def stats(self):
+        """Return the number of cached charts and their size in bytes."""
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.total_bytes}
+
+
+@st.cache_resource
+def get_chart_cache():
+    """Get the chart cache shared by every session in this process."""
+    return ChartCache()
@@ -0,0 +1,55 @@
+import os
+
+
+# Application settings. Each one can be overridden with a MINDSCRIBE_* environment variable.
+
+# Hugging Face id or local path of the emotion classification model
+EMOTION_MODEL = os.environ.get("MINDSCRIBE_EMOTION_MODEL", "j-hartmann/emotion-english-distilroberta-base")
+
+# Persistent cache of emotion scores, kept next to database.db
+EMOTION_CACHE_PATH = os.environ.get("MINDSCRIBE_EMOTION_CACHE_PATH", "emotion_cache.db")
+EMOTION_CACHE_MAX_ENTRIES = int(os.environ.get("MINDSCRIBE_EMOTION_CACHE_MAX_ENTRIES", "50000"))
+EMOTION_CACHE_MEMORY_ENTRIES = int(os.environ.get("MINDSCRIBE_EMOTION_CACHE_MEMORY_ENTRIES", "1024"))
+
+# Emotion classifier backend: 'pytorch', 'onnx' (fp32) or 'onnx-int8' (dynamically quantized).
+# The ONNX backends need `pip install "optimum[onnxruntime]"`; without it they fall back to PyTorch.
+EMOTION_BACKEND = os.environ.get("MINDSCRIBE_EMOTION_BACKEND", "pytorch")
+ONNX_MODEL_DIR = os.environ.get("MINDSCRIBE_ONNX_MODEL_DIR", "onnx_models")
+
+# Background scoring queue for saved session notes
+SCORING_BATCH_SIZE = int(os.environ.get("MINDSCRIBE_SCORING_BATCH_SIZE", "8"))
+SCORING_POLL_SECONDS = float(os.environ.get("MINDSCRIBE_SCORING_POLL_SECONDS", "2"))
+SCORING_LEASE_SECONDS = float(os.environ.get("MINDSCRIBE_SCORING_LEASE_SECONDS", "300"))
+SCORING_MAX_ATTEMPTS = int(os.environ.get("MINDSCRIBE_SCORING_MAX_ATTEMPTS", "3"))
+SCORING_RETRY_DELAY_SECONDS = float(os.environ.get("MINDSCRIBE_SCORING_RETRY_DELAY_SECONDS", "10"))
+
+# Load and warm the emotion model on a background thread when the app starts
+PREWARM_MODEL = os.environ.get("MINDSCRIBE_PREWARM", "0") == "1"
+
+# Optional shared inference server, e.g. "http://127.0.0.1:8765". Empty means score in-process.
+INFERENCE_SERVER_URL = os.environ.get("MINDSCRIBE_INFERENCE_SERVER_URL", "")
+INFERENCE_SERVER_TIMEOUT_SECONDS = float(os.environ.get("MINDSCRIBE_INFERENCE_SERVER_TIMEOUT_SECONDS", "60"))
+INFERENCE_BATCH_WINDOW_MS = float(os.environ.get("MINDSCRIBE_INFERENCE_BATCH_WINDOW_MS", "10"))
+INFERENCE_MAX_BATCH = int(os.environ.get("MINDSCRIBE_INFERENCE_MAX_BATCH", "64"))
+
+# SQLite connection pool used by Database
+DATABASE_POOL_SIZE = int(os.environ.get("MINDSCRIBE_DATABASE_POOL_SIZE", "8"))
+DATABASE_BUSY_TIMEOUT_MS = int(os.environ.get("MINDSCRIBE_DATABASE_BUSY_TIMEOUT_MS", "5000"))
+DATABASE_CACHE_SIZE_KB = int(os.environ.get("MINDSCRIBE_DATABASE_CACHE_SIZE_KB", "16384"))
+
+# Session notes shown per "Load Older Notes" page in the patient view
+SESSION_NOTES_PAGE_SIZE = int(os.environ.get("MINDSCRIBE_SESSION_NOTES_PAGE_SIZE", "10"))
+
+# Per-patient emotion DataFrames cached in memory for the trends tab
+DATAFRAME_CACHE_MAX_ENTRIES = int(os.environ.get("MINDSCRIBE_DATAFRAME_CACHE_MAX_ENTRIES", "256"))
+DATAFRAME_CACHE_MAX_MB = float(os.environ.get("MINDSCRIBE_DATAFRAME_CACHE_MAX_MB", "128"))
+
+# Rendered chart images cached in memory, keyed by a hash of the data they show
+CHART_CACHE_MAX_ENTRIES = int(os.environ.get("MINDSCRIBE_CHART_CACHE_MAX_ENTRIES", "512"))
+CHART_CACHE_MAX_MB = float(os.environ.get("MINDSCRIBE_CHART_CACHE_MAX_MB", "64"))
+
+# Notes older than this many days are moved to the compressed archive database by utils.archive
+ARCHIVE_AFTER_DAYS = int(os.environ.get("MINDSCRIBE_ARCHIVE_AFTER_DAYS", "365"))
+
+# Processes rendering reports for the whole-caseload ZIP export
+CASELOAD_EXPORT_WORKERS = int(os.environ.get("MINDSCRIBE_CASELOAD_EXPORT_WORKERS", "2"))
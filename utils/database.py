@@ -1,280 +1,1635 @@
-import sqlite3
-import os
-import json
-from datetime import datetime
-import pandas as pd
-
-
-class Database:
-    def __init__(self, db_path="database.db"):
-        """Initialize database connection and create tables if they don't exist."""
-        self.db_path = db_path
-        self.conn = None
-        self.create_tables()
-
-    def get_connection(self):
-        """Get SQLite connection, creating it if needed."""
-        if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row
-        return self.conn
-
-    def create_tables(self):
-        """Create necessary database tables if they don't exist."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Create therapists table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS therapists (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        # Create patients table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS patients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            therapist_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            age INTEGER,
-            gender TEXT,
-            contact TEXT,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (therapist_id) REFERENCES therapists(id)
-        )
-        ''')
-
-        # Create session_notes table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS session_notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patient_id INTEGER NOT NULL,
-            therapist_id INTEGER NOT NULL,
-            note_text TEXT NOT NULL,
-            emotions TEXT NOT NULL,  -- JSON string of emotion data
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (patient_id) REFERENCES patients(id),
-            FOREIGN KEY (therapist_id) REFERENCES therapists(id)
-        )
-        ''')
-
-        conn.commit()
-
-    def add_therapist(self, username, password_hash, name, email):
-        """Add a new therapist to the database."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
-                "INSERT INTO therapists (username, password_hash, name, email) VALUES (?, ?, ?, ?)",
-                (username, password_hash, name, email)
-            )
-            conn.commit()
-            return cursor.lastrowid
-        except sqlite3.IntegrityError:
-            return None  # Username or email already exists
-
-    def get_therapist_by_username(self, username):
-        """Get therapist data by username."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM therapists WHERE username = ?", (username,))
-        therapist = cursor.fetchone()
-
-        if therapist:
-            return dict(therapist)
-        return None
-
-    def add_patient(self, therapist_id, name, age=None, gender=None, contact=None, notes=None):
-        """Add a new patient for a therapist."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "INSERT INTO patients (therapist_id, name, age, gender, contact, notes) VALUES (?, ?, ?, ?, ?, ?)",
-            (therapist_id, name, age, gender, contact, notes)
-        )
-        conn.commit()
-        return cursor.lastrowid
-
-    def get_patients(self, therapist_id):
-        """Get all patients for a therapist."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM patients WHERE therapist_id = ? ORDER BY name", (therapist_id,))
-        patients = cursor.fetchall()
-
-        return [dict(patient) for patient in patients]
-
-    def get_patient(self, patient_id, therapist_id):
-        """Get a specific patient with validation for the therapist."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "SELECT * FROM patients WHERE id = ? AND therapist_id = ?",
-            (patient_id, therapist_id)
-        )
-        patient = cursor.fetchone()
-
-        if patient:
-            return dict(patient)
-        return None
-
-    def update_patient(self, patient_id, therapist_id, name, age=None, gender=None, contact=None, notes=None):
-        """Update patient information."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """UPDATE patients 
-               SET name = ?, age = ?, gender = ?, contact = ?, notes = ?
-               WHERE id = ? AND therapist_id = ?""",
-            (name, age, gender, contact, notes, patient_id, therapist_id)
-        )
-        conn.commit()
-        return cursor.rowcount > 0
-
-    def delete_patient(self, patient_id, therapist_id):
-        """Delete a patient and all related session notes."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # First delete associated session notes
-        cursor.execute(
-            "DELETE FROM session_notes WHERE patient_id = ? AND therapist_id = ?",
-            (patient_id, therapist_id)
-        )
-
-        # Then delete the patient
-        cursor.execute(
-            "DELETE FROM patients WHERE id = ? AND therapist_id = ?",
-            (patient_id, therapist_id)
-        )
-
-        conn.commit()
-        return cursor.rowcount > 0
-
-    def add_session_note(self, patient_id, therapist_id, note_text, emotions):
-        """Add a new session note with emotion analysis results."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Convert emotions dict to JSON string
-        emotions_json = json.dumps(emotions)
-
-        cursor.execute(
-            "INSERT INTO session_notes (patient_id, therapist_id, note_text, emotions) VALUES (?, ?, ?, ?)",
-            (patient_id, therapist_id, note_text, emotions_json)
-        )
-        conn.commit()
-        return cursor.lastrowid
-
-    def get_session_notes(self, patient_id, therapist_id):
-        """Get all session notes for a specific patient."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """SELECT * FROM session_notes 
-               WHERE patient_id = ? AND therapist_id = ?
-               ORDER BY timestamp DESC""",
-            (patient_id, therapist_id)
-        )
-        notes = cursor.fetchall()
-
-        result = []
-        for note in notes:
-            note_dict = dict(note)
-            note_dict['emotions'] = json.loads(note_dict['emotions'])
-            result.append(note_dict)
-
-        return result
-
-    def get_emotions_dataframe(self, patient_id, therapist_id):
-        """Get emotion data as a pandas DataFrame for visualization."""
-        notes = self.get_session_notes(patient_id, therapist_id)
-
-        if not notes:
-            return pd.DataFrame()
-
-        data = []
-        for note in notes:
-            timestamp = note['timestamp']
-            emotions = note['emotions']
-
-            # Find the emotion with highest score
-            dominant_emotion = max(emotions, key=lambda x: emotions[x])
-
-            row = {
-                'timestamp': timestamp,
-                'dominant_emotion': dominant_emotion
-            }
-            # Add individual emotion scores
-            for emotion, score in emotions.items():
-                row[emotion] = score
-
-            data.append(row)
-
-        df = pd.DataFrame(data)
-
-        # Convert timestamp strings to datetime objects
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp')
-
-        return df
-
-    def export_patient_data_to_csv(self, patient_id, therapist_id):
-        """Export all data for a patient to a CSV file."""
-        patient = self.get_patient(patient_id, therapist_id)
-        if not patient:
-            return None
-
-        notes = self.get_session_notes(patient_id, therapist_id)
-
-        # Create a DataFrame for the session notes
-        rows = []
-        for note in notes:
-            emotions = note['emotions']
-            dominant_emotion = max(emotions, key=lambda x: emotions[x])
-
-            row = {
-                'Date': note['timestamp'],
-                'Note': note['note_text'],
-                'Dominant Emotion': dominant_emotion
-            }
-            # Add individual emotion scores
-            for emotion, score in emotions.items():
-                row[f"Score: {emotion}"] = score
-
-            rows.append(row)
-
-        notes_df = pd.DataFrame(rows)
-
-        # Create a filename with patient name and timestamp
-        safe_name = "".join([c if c.isalnum() else "_" for c in patient['name']])
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{safe_name}_records_{timestamp}.csv"
-
-        # Save to CSV
-        if not notes_df.empty:
-            notes_df.to_csv(filename, index=False)
-            return filename
-        return None
-
-    def close(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
+import sqlite3
+import os
+import io
+import csv
+import sys
+import json
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from utils.config import DATABASE_POOL_SIZE, DATABASE_BUSY_TIMEOUT_MS, DATABASE_CACHE_SIZE_KB
+
+
+class ConnectionPool:
+    """Process-wide pool of SQLite connections to one database file.
+
+    A connection is handed to one Database object, and so to one thread, at a
+    time and returned when that object is closed. Connections are opened in
+    WAL mode so readers never block the writer, and wait on a busy timeout
+    instead of failing with "database is locked".
+    """
+
+    def __init__(self, db_path, size=DATABASE_POOL_SIZE, busy_timeout_ms=DATABASE_BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        # Pooled connections move between Streamlit script threads, never used by two at once
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        # NORMAL is durable across application crashes in WAL mode and avoids an fsync per commit
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{int(DATABASE_CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def acquire(self):
+        """Take an idle connection, opening a new one if none is free."""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full."""
+        # Never hand a half-finished transaction to the next user
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_ready_paths = set()
+_schema_lock = threading.Lock()
+_search_index_paths = set()
+
+# Columns of a note, selected by name so both tiers line up
+_NOTE_COLUMNS = ("id, patient_id, therapist_id, note_text, emotions, emotion_windows, sentence_emotions, "
+                 "emotion_status, dominant_emotion, dominant_score, timestamp")
+
+
+def get_connection_pool(db_path):
+    """Get the process-wide connection pool for a database file."""
+    with _pools_lock:
+        if db_path not in _pools:
+            _pools[db_path] = ConnectionPool(db_path)
+        return _pools[db_path]
+
+
+class Database:
+    def __init__(self, db_path="database.db"):
+        """Initialize database connection and create tables if they don't exist.
+
+        Old notes moved by archive_old_notes live in "<db name>_archive.db"
+        next to the main database. The path is derived rather than configurable,
+        so every process reading the database finds the same archive.
+        """
+        self.db_path = db_path
+        self.archive_path = os.path.splitext(db_path)[0] + "_archive.db"
+        self.conn = None
+
+        # Schema setup and migrations only need to run once per process
+        with _schema_lock:
+            if db_path not in _ready_paths:
+                self.create_tables()
+                _ready_paths.add(db_path)
+
+    def get_connection(self):
+        """Get SQLite connection, taking one from the pool if needed."""
+        if self.conn is None:
+            self.conn = get_connection_pool(self.db_path).acquire()
+        return self.conn
+
+    def create_tables(self):
+        """Create necessary database tables if they don't exist."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # Create therapists table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS therapists (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+
+        # Create patients table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS patients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            therapist_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            age INTEGER,
+            gender TEXT,
+            contact TEXT,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (therapist_id) REFERENCES therapists(id)
+        )
+        ''')
+
+        # Create session_notes table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER NOT NULL,
+            therapist_id INTEGER NOT NULL,
+            note_text TEXT NOT NULL,
+            emotions TEXT NOT NULL,  -- JSON string of emotion data
+            emotion_windows TEXT,  -- JSON list of per-window scores for long notes
+            sentence_emotions TEXT,  -- Compact JSON of per-sentence scores for the timeline
+            emotion_status TEXT NOT NULL DEFAULT 'done',  -- 'pending', 'done' or 'failed'
+            dominant_emotion TEXT,  -- Highest scoring emotion, materialized at write time
+            dominant_score REAL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (patient_id) REFERENCES patients(id),
+            FOREIGN KEY (therapist_id) REFERENCES therapists(id)
+        )
+        ''')
+
+        # Create scoring_jobs table, the durable queue for background emotion analysis
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scoring_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_id INTEGER UNIQUE NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',  -- 'pending', 'running' or 'failed'
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            available_at REAL NOT NULL,  -- Unix time the job may next be claimed
+            lease_expires_at REAL,  -- Unix time a running job is considered abandoned
+            FOREIGN KEY (note_id) REFERENCES session_notes(id)
+        )
+        ''')
+
+        # Create session_emotions table, one row per note and emotion for SQL-side aggregation
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_emotions (
+            note_id INTEGER NOT NULL,
+            patient_id INTEGER NOT NULL,
+            therapist_id INTEGER NOT NULL,
+            timestamp TIMESTAMP NOT NULL,  -- Copied from the note so trends need no join
+            emotion TEXT NOT NULL,
+            score REAL NOT NULL,
+            is_dominant INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (note_id, emotion),
+            FOREIGN KEY (note_id) REFERENCES session_notes(id)
+        )
+        ''')
+
+        # Create emotion_versions table, kept current by the triggers below so cached
+        # trend data can tell whether notes were appended or existing rows changed
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emotion_versions'")
+        backfill_versions = cursor.fetchone() is None
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS emotion_versions (
+            patient_id INTEGER NOT NULL,
+            therapist_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL DEFAULT 0,  -- Bumped when existing rows change or are removed
+            last_note_id INTEGER NOT NULL DEFAULT 0,  -- Newest note with emotion rows
+            PRIMARY KEY (patient_id, therapist_id)
+        )
+        ''')
+        # A note scored after a newer one can't be appended, so it counts as a change
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS session_emotions_inserted AFTER INSERT ON session_emotions
+        BEGIN
+            INSERT INTO emotion_versions (patient_id, therapist_id, last_note_id)
+            VALUES (NEW.patient_id, NEW.therapist_id, NEW.note_id)
+            ON CONFLICT (patient_id, therapist_id) DO UPDATE SET
+                revision = revision + (excluded.last_note_id < last_note_id),
+                last_note_id = MAX(last_note_id, excluded.last_note_id);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS session_emotions_deleted AFTER DELETE ON session_emotions
+        BEGIN
+            INSERT INTO emotion_versions (patient_id, therapist_id, revision)
+            VALUES (OLD.patient_id, OLD.therapist_id, 1)
+            ON CONFLICT (patient_id, therapist_id) DO UPDATE SET revision = revision + 1;
+        END
+        ''')
+        if backfill_versions:
+            cursor.execute(
+                """INSERT INTO emotion_versions (patient_id, therapist_id, last_note_id)
+                   SELECT patient_id, therapist_id, MAX(note_id) FROM session_emotions
+                   GROUP BY patient_id, therapist_id"""
+            )
+
+        # Add columns introduced after the original schema to existing databases
+        self._add_column_if_missing(cursor, 'session_notes', 'emotion_windows', 'TEXT')
+        self._add_column_if_missing(cursor, 'session_notes', 'sentence_emotions', 'TEXT')
+        self._add_column_if_missing(cursor, 'session_notes', 'emotion_status', "TEXT NOT NULL DEFAULT 'done'")
+        self._add_column_if_missing(cursor, 'session_notes', 'dominant_emotion', 'TEXT')
+        self._add_column_if_missing(cursor, 'session_notes', 'dominant_score', 'REAL')
+
+        # Indexes for the lookups that run on every page load. Each starts with
+        # the filter columns and ends with the sort column, so SQLite reads rows
+        # already in order instead of scanning and sorting the whole table.
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_patients_therapist_name ON patients (therapist_id, name)"
+        )
+        cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_session_notes_patient_timestamp
+               ON session_notes (patient_id, therapist_id, timestamp)"""
+        )
+        cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_session_notes_patient_dominant
+               ON session_notes (patient_id, therapist_id, dominant_emotion)"""
+        )
+        cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_session_emotions_patient_emotion
+               ON session_emotions (patient_id, therapist_id, emotion, timestamp, note_id, score)"""
+        )
+        # Partial index of each note's dominant emotion, for the latest emotion on the caseload overview
+        cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_session_emotions_patient_dominant
+               ON session_emotions (patient_id, therapist_id, timestamp, note_id, emotion) WHERE is_dominant = 1"""
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scoring_jobs_status ON scoring_jobs (status, available_at)"
+        )
+
+        # Create rollup tables, maintained on every write so summaries never scan a patient's history
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emotion_rollups'")
+        backfill_rollups = cursor.fetchone() is None
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS emotion_rollups (
+            patient_id INTEGER NOT NULL,
+            therapist_id INTEGER NOT NULL,
+            emotion TEXT NOT NULL,
+            note_count INTEGER NOT NULL,
+            score_sum REAL NOT NULL,
+            score_min REAL,
+            score_max REAL,
+            dominant_count INTEGER NOT NULL,
+            latest_key TEXT,  -- "timestamp|note id" of the newest score, for the trend direction
+            latest_score REAL,
+            previous_key TEXT,
+            previous_score REAL,
+            stale INTEGER NOT NULL DEFAULT 0,  -- 1 when a removed score may have been the min, max or latest
+            PRIMARY KEY (patient_id, therapist_id, emotion)
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS emotion_buckets (
+            patient_id INTEGER NOT NULL,
+            therapist_id INTEGER NOT NULL,
+            emotion TEXT NOT NULL,
+            period TEXT NOT NULL,  -- 'day' or 'week'
+            bucket TEXT NOT NULL,  -- Date of the day, or of the Monday starting the week
+            note_count INTEGER NOT NULL,
+            score_sum REAL NOT NULL,
+            score_min REAL NOT NULL,
+            score_max REAL NOT NULL,
+            dominant_count INTEGER NOT NULL,
+            PRIMARY KEY (patient_id, therapist_id, emotion, period, bucket)
+        )
+        ''')
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_emotion_rollups_therapist ON emotion_rollups (therapist_id)"
+        )
+        if backfill_rollups:
+            self._backfill_rollups(cursor)
+
+        # Per-patient summary of the notes moved to the archive database, so
+        # reads only attach the archive for patients that have archived notes
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_note_counts (
+            patient_id INTEGER NOT NULL,
+            therapist_id INTEGER NOT NULL,
+            note_count INTEGER NOT NULL,
+            newest_timestamp TIMESTAMP NOT NULL,
+            PRIMARY KEY (patient_id, therapist_id)
+        )
+        ''')
+
+        # Full-text index over note text, kept in sync with session_notes by triggers
+        self._create_search_index(cursor)
+
+        # Convert notes saved as JSON only before session_emotions existed
+        self._migrate_emotion_rows(cursor)
+
+        conn.commit()
+
+    def _add_column_if_missing(self, cursor, table, column, definition):
+        """Add a column to an existing table unless it is already present."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [row['name'] for row in cursor.fetchall()]
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _create_search_index(self, cursor):
+        """Create the FTS5 index of session notes and its sync triggers.
+
+        Search falls back to LIKE matching when SQLite was built without FTS5.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'session_notes_fts'")
+        if cursor.fetchone():
+            _search_index_paths.add(self.db_path)
+            return
+
+        try:
+            # External content table: the index stores no second copy of the notes
+            cursor.execute('''
+            CREATE VIRTUAL TABLE session_notes_fts USING fts5(
+                note_text, content='session_notes', content_rowid='id', tokenize='porter unicode61'
+            )
+            ''')
+        except sqlite3.OperationalError:
+            return
+
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS session_notes_fts_insert AFTER INSERT ON session_notes
+        BEGIN
+            INSERT INTO session_notes_fts (rowid, note_text) VALUES (NEW.id, NEW.note_text);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS session_notes_fts_delete AFTER DELETE ON session_notes
+        BEGIN
+            INSERT INTO session_notes_fts (session_notes_fts, rowid, note_text) VALUES ('delete', OLD.id, OLD.note_text);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS session_notes_fts_update AFTER UPDATE OF note_text ON session_notes
+        BEGIN
+            INSERT INTO session_notes_fts (session_notes_fts, rowid, note_text) VALUES ('delete', OLD.id, OLD.note_text);
+            INSERT INTO session_notes_fts (rowid, note_text) VALUES (NEW.id, NEW.note_text);
+        END
+        ''')
+
+        # Index the notes written before the index existed
+        cursor.execute("INSERT INTO session_notes_fts (session_notes_fts) VALUES ('rebuild')")
+        _search_index_paths.add(self.db_path)
+
+    def _backfill_rollups(self, cursor):
+        """Build the rollup tables from the emotion rows already stored."""
+        # Min, max and latest scores are recomputed on first read
+        cursor.execute(
+            """INSERT INTO emotion_rollups (patient_id, therapist_id, emotion, note_count, score_sum,
+                                            score_min, score_max, dominant_count, stale)
+               SELECT patient_id, therapist_id, emotion, COUNT(*), SUM(score), MIN(score), MAX(score),
+                      SUM(is_dominant), 1
+               FROM session_emotions
+               GROUP BY patient_id, therapist_id, emotion"""
+        )
+        for period, bucket in [('day', "date(timestamp)"), ('week', "date(timestamp, '-6 days', 'weekday 1')")]:
+            cursor.execute(
+                f"""INSERT INTO emotion_buckets (patient_id, therapist_id, emotion, period, bucket, note_count,
+                                                 score_sum, score_min, score_max, dominant_count)
+                    SELECT patient_id, therapist_id, emotion, ?, {bucket}, COUNT(*), SUM(score), MIN(score),
+                           MAX(score), SUM(is_dominant)
+                    FROM session_emotions
+                    GROUP BY patient_id, therapist_id, emotion, {bucket}""",
+                (period,)
+            )
+
+    def _migrate_emotion_rows(self, cursor):
+        """Fill session_emotions and the dominant emotion for notes that only have the JSON blob."""
+        cursor.execute("SELECT id, emotions FROM session_notes WHERE dominant_emotion IS NULL AND emotions != '{}'")
+        notes = cursor.fetchall()
+        if notes:
+            self._store_note_emotions(cursor, [(note['id'], json.loads(note['emotions'])) for note in notes])
+
+    def _store_note_emotions(self, cursor, note_emotions):
+        """Materialize the dominant emotion and per-emotion rows of scored notes.
+
+        Runs inside the caller's transaction so the JSON blob, the dominant
+        emotion and session_emotions always change together.
+
+        Args:
+            note_emotions: List of (note_id, emotions dict) pairs
+        """
+        dominants = {}
+        for note_id, emotions in note_emotions:
+            dominants[note_id] = max(emotions, key=lambda x: emotions[x]) if emotions else None
+
+        cursor.executemany(
+            "UPDATE session_notes SET dominant_emotion = ?, dominant_score = ? WHERE id = ?",
+            [(dominants[note_id], emotions.get(dominants[note_id]), note_id) for note_id, emotions in note_emotions]
+        )
+        removed_rows = self._get_note_emotion_rows(cursor, [note_id for note_id, _ in note_emotions])
+        cursor.executemany(
+            "DELETE FROM session_emotions WHERE note_id = ?",
+            [(note_id,) for note_id, _ in note_emotions]
+        )
+        cursor.executemany(
+            """INSERT INTO session_emotions (note_id, patient_id, therapist_id, timestamp, emotion, score, is_dominant)
+               SELECT id, patient_id, therapist_id, timestamp, ?, ?, ? FROM session_notes WHERE id = ?""",
+            [(emotion, score, int(emotion == dominants[note_id]), note_id)
+             for note_id, emotions in note_emotions
+             for emotion, score in emotions.items()]
+        )
+        added_rows = self._get_note_emotion_rows(cursor, [note_id for note_id, _ in note_emotions])
+        self._update_rollups(cursor, removed_rows, added_rows)
+
+    def _get_note_emotion_rows(self, cursor, note_ids):
+        """Get the session_emotions rows of the given notes, one query per 500 notes."""
+        rows = []
+        # Batched to stay under SQLite's limit on bound parameters
+        for offset in range(0, len(note_ids), 500):
+            batch = note_ids[offset:offset + 500]
+            cursor.execute(
+                f"""SELECT note_id, patient_id, therapist_id, timestamp, emotion, score, is_dominant
+                    FROM session_emotions WHERE note_id IN ({", ".join("?" * len(batch))})""",
+                batch
+            )
+            rows.extend(dict(row) for row in cursor.fetchall())
+        return rows
+
+    def _update_rollups(self, cursor, removed_rows, added_rows):
+        """Apply removed and added emotion rows to the rollup tables.
+
+        Counts and sums are adjusted in place. Removing a score marks the
+        rollup stale, since it may have been the minimum, maximum or one of
+        the two latest scores; those are recomputed on the next read. Day and
+        week buckets touched by the change are recomputed from their rows
+        with one query per bucket, which the patient/emotion/timestamp index
+        keeps cheap.
+        """
+        cursor.executemany(
+            """UPDATE emotion_rollups
+               SET note_count = note_count - 1, score_sum = score_sum - ?,
+                   dominant_count = dominant_count - ?, stale = 1
+               WHERE patient_id = ? AND therapist_id = ? AND emotion = ?""",
+            [(row['score'], row['is_dominant'], row['patient_id'], row['therapist_id'], row['emotion'])
+             for row in removed_rows]
+        )
+        cursor.executemany(
+            """DELETE FROM emotion_rollups
+               WHERE patient_id = ? AND therapist_id = ? AND emotion = ? AND note_count <= 0""",
+            {(row['patient_id'], row['therapist_id'], row['emotion']) for row in removed_rows}
+        )
+
+        # Newer scores push the latest one down to previous
+        cursor.executemany(
+            """INSERT INTO emotion_rollups (patient_id, therapist_id, emotion, note_count, score_sum, score_min,
+                                            score_max, dominant_count, latest_key, latest_score)
+               VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (patient_id, therapist_id, emotion) DO UPDATE SET
+                   note_count = note_count + 1,
+                   score_sum = score_sum + excluded.score_sum,
+                   score_min = MIN(score_min, excluded.score_min),
+                   score_max = MAX(score_max, excluded.score_max),
+                   dominant_count = dominant_count + excluded.dominant_count,
+                   latest_key = MAX(IFNULL(latest_key, ''), excluded.latest_key),
+                   latest_score = CASE WHEN excluded.latest_key > IFNULL(latest_key, '')
+                                       THEN excluded.latest_score ELSE latest_score END,
+                   previous_key = CASE WHEN excluded.latest_key > IFNULL(latest_key, '') THEN latest_key
+                                       WHEN excluded.latest_key > IFNULL(previous_key, '') THEN excluded.latest_key
+                                       ELSE previous_key END,
+                   previous_score = CASE WHEN excluded.latest_key > IFNULL(latest_key, '') THEN latest_score
+                                         WHEN excluded.latest_key > IFNULL(previous_key, '') THEN excluded.latest_score
+                                         ELSE previous_score END""",
+            [(row['patient_id'], row['therapist_id'], row['emotion'], row['score'], row['score'], row['score'],
+              row['is_dominant'], self._recency_key(row), row['score'])
+             for row in added_rows]
+        )
+
+        # Emotions touched in each day and week bucket, so every bucket is recomputed once
+        buckets = {}
+        for row in removed_rows + added_rows:
+            for period in ('day', 'week'):
+                key = (row['patient_id'], row['therapist_id'], period, self._bucket_start(row['timestamp'], period))
+                buckets.setdefault(key, set()).add(row['emotion'])
+
+        replaced = []
+        deleted = []
+        for (patient_id, therapist_id, period, bucket), emotions in buckets.items():
+            start = datetime.strptime(bucket, "%Y-%m-%d")
+            end = start + timedelta(days=1 if period == 'day' else 7)
+            emotions = sorted(emotions)
+            cursor.execute(
+                f"""SELECT emotion, COUNT(*) AS note_count, SUM(score) AS score_sum, MIN(score) AS score_min,
+                           MAX(score) AS score_max, SUM(is_dominant) AS dominant_count
+                    FROM session_emotions
+                    WHERE patient_id = ? AND therapist_id = ? AND emotion IN ({", ".join("?" * len(emotions))})
+                      AND timestamp >= ? AND timestamp < ?
+                    GROUP BY emotion""",
+                [patient_id, therapist_id] + emotions + [bucket, end.strftime("%Y-%m-%d")]
+            )
+            totals = {row['emotion']: row for row in cursor.fetchall()}
+            for emotion in emotions:
+                if emotion in totals:
+                    row = totals[emotion]
+                    replaced.append((patient_id, therapist_id, emotion, period, bucket, row['note_count'],
+                                     row['score_sum'], row['score_min'], row['score_max'], row['dominant_count']))
+                else:
+                    deleted.append((patient_id, therapist_id, emotion, period, bucket))
+
+        cursor.executemany(
+            """INSERT OR REPLACE INTO emotion_buckets (patient_id, therapist_id, emotion, period, bucket,
+                                                       note_count, score_sum, score_min, score_max,
+                                                       dominant_count)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            replaced
+        )
+        cursor.executemany(
+            """DELETE FROM emotion_buckets
+               WHERE patient_id = ? AND therapist_id = ? AND emotion = ? AND period = ? AND bucket = ?""",
+            deleted
+        )
+
+    def _recency_key(self, row):
+        """Sortable "timestamp|note id" key; ties on timestamp go to the newer note."""
+        return f"{row['timestamp']}|{row['note_id']:012d}"
+
+    def _bucket_start(self, timestamp, period):
+        """Date string of the day, or of the Monday of the week, a timestamp falls in."""
+        day = datetime.strptime(str(timestamp)[:10], "%Y-%m-%d")
+        if period == 'week':
+            day -= timedelta(days=day.weekday())
+        return day.strftime("%Y-%m-%d")
+
+    def _refresh_stale_rollups(self, patient_id, therapist_id):
+        """Recompute min, max and the two latest scores of rollups marked stale by a removed score."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT emotion FROM emotion_rollups WHERE patient_id = ? AND therapist_id = ? AND stale = 1",
+            (patient_id, therapist_id)
+        )
+        stale_emotions = [row['emotion'] for row in cursor.fetchall()]
+        if not stale_emotions:
+            return
+
+        for emotion in stale_emotions:
+            cursor.execute(
+                """SELECT MIN(score) AS score_min, MAX(score) AS score_max FROM session_emotions
+                   WHERE patient_id = ? AND therapist_id = ? AND emotion = ?""",
+                (patient_id, therapist_id, emotion)
+            )
+            bounds = cursor.fetchone()
+            cursor.execute(
+                """SELECT note_id, timestamp, score FROM session_emotions
+                   WHERE patient_id = ? AND therapist_id = ? AND emotion = ?
+                   ORDER BY timestamp DESC, note_id DESC
+                   LIMIT 2""",
+                (patient_id, therapist_id, emotion)
+            )
+            recent = cursor.fetchall()
+            latest = recent[0] if recent else None
+            previous = recent[1] if len(recent) > 1 else None
+            cursor.execute(
+                """UPDATE emotion_rollups
+                   SET score_min = ?, score_max = ?, latest_key = ?, latest_score = ?,
+                       previous_key = ?, previous_score = ?, stale = 0
+                   WHERE patient_id = ? AND therapist_id = ? AND emotion = ?""",
+                (bounds['score_min'], bounds['score_max'],
+                 self._recency_key(latest) if latest else None, latest['score'] if latest else None,
+                 self._recency_key(previous) if previous else None, previous['score'] if previous else None,
+                 patient_id, therapist_id, emotion)
+            )
+        conn.commit()
+
+    def add_therapist(self, username, password_hash, name, email):
+        """Add a new therapist to the database."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                "INSERT INTO therapists (username, password_hash, name, email) VALUES (?, ?, ?, ?)",
+                (username, password_hash, name, email)
+            )
+            conn.commit()
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            return None  # Username or email already exists
+
+    def get_therapist_by_username(self, username):
+        """Get therapist data by username."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM therapists WHERE username = ?", (username,))
+        therapist = cursor.fetchone()
+
+        if therapist:
+            return dict(therapist)
+        return None
+
+    def add_patient(self, therapist_id, name, age=None, gender=None, contact=None, notes=None):
+        """Add a new patient for a therapist."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "INSERT INTO patients (therapist_id, name, age, gender, contact, notes) VALUES (?, ?, ?, ?, ?, ?)",
+            (therapist_id, name, age, gender, contact, notes)
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+    def get_patients(self, therapist_id):
+        """Get all patients for a therapist."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM patients WHERE therapist_id = ? ORDER BY name", (therapist_id,))
+        patients = cursor.fetchall()
+
+        return [dict(patient) for patient in patients]
+
+    def get_patient(self, patient_id, therapist_id):
+        """Get a specific patient with validation for the therapist."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT * FROM patients WHERE id = ? AND therapist_id = ?",
+            (patient_id, therapist_id)
+        )
+        patient = cursor.fetchone()
+
+        if patient:
+            return dict(patient)
+        return None
+
+    def update_patient(self, patient_id, therapist_id, name, age=None, gender=None, contact=None, notes=None):
+        """Update patient information."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """UPDATE patients 
+               SET name = ?, age = ?, gender = ?, contact = ?, notes = ?
+               WHERE id = ? AND therapist_id = ?""",
+            (name, age, gender, contact, notes, patient_id, therapist_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+
+    def delete_patient(self, patient_id, therapist_id):
+        """Delete a patient and all related session notes."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # Archived notes go too; attaching has to happen before the transaction starts
+        if self._get_archive_counts(patient_id, therapist_id) and self._attach_archive():
+            cursor.execute(
+                "DELETE FROM archive.archived_notes WHERE patient_id = ? AND therapist_id = ?",
+                (patient_id, therapist_id)
+            )
+        cursor.execute(
+            "DELETE FROM archived_note_counts WHERE patient_id = ? AND therapist_id = ?",
+            (patient_id, therapist_id)
+        )
+
+        # First delete queued scoring jobs, emotion rows, rollups and associated session notes
+        for table in ('emotion_rollups', 'emotion_buckets'):
+            cursor.execute(
+                f"DELETE FROM {table} WHERE patient_id = ? AND therapist_id = ?",
+                (patient_id, therapist_id)
+            )
+        cursor.execute(
+            "DELETE FROM session_emotions WHERE patient_id = ? AND therapist_id = ?",
+            (patient_id, therapist_id)
+        )
+        cursor.execute(
+            """DELETE FROM scoring_jobs WHERE note_id IN (
+                   SELECT id FROM session_notes WHERE patient_id = ? AND therapist_id = ?)""",
+            (patient_id, therapist_id)
+        )
+        cursor.execute(
+            "DELETE FROM session_notes WHERE patient_id = ? AND therapist_id = ?",
+            (patient_id, therapist_id)
+        )
+
+        # Then delete the patient
+        cursor.execute(
+            "DELETE FROM patients WHERE id = ? AND therapist_id = ?",
+            (patient_id, therapist_id)
+        )
+
+        conn.commit()
+        return cursor.rowcount > 0
+
+    def add_session_note(self, patient_id, therapist_id, note_text, emotions, emotion_windows=None,
+                         sentence_emotions=None):
+        """Add a new session note with emotion analysis results.
+
+        Args:
+            emotion_windows: Optional list of per-window scores for notes that
+                             were scored in overlapping chunks
+            sentence_emotions: Optional compact per-sentence scores from
+                               analyze_sentences
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # Convert emotions dict to JSON string
+        emotions_json = json.dumps(emotions)
+        windows_json = json.dumps(emotion_windows) if emotion_windows else None
+        sentences_json = json.dumps(sentence_emotions) if sentence_emotions else None
+
+        cursor.execute(
+            """INSERT INTO session_notes
+                   (patient_id, therapist_id, note_text, emotions, emotion_windows, sentence_emotions)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (patient_id, therapist_id, note_text, emotions_json, windows_json, sentences_json)
+        )
+        note_id = cursor.lastrowid
+        self._store_note_emotions(cursor, [(note_id, emotions)])
+        conn.commit()
+        return note_id
+
+    def queue_session_note(self, patient_id, therapist_id, note_text):
+        """Save a session note right away and queue its emotion analysis.
+
+        The note is stored with an empty emotion dict and a 'pending' status
+        until a background worker scores it.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """INSERT INTO session_notes (patient_id, therapist_id, note_text, emotions, emotion_status)
+               VALUES (?, ?, ?, ?, 'pending')""",
+            (patient_id, therapist_id, note_text, json.dumps({}))
+        )
+        note_id = cursor.lastrowid
+
+        cursor.execute(
+            "INSERT INTO scoring_jobs (note_id, available_at) VALUES (?, ?)",
+            (note_id, time.time())
+        )
+        conn.commit()
+        return note_id
+
+    def import_session_notes(self, notes):
+        """Insert a chunk of imported session notes in a single transaction.
+
+        Notes with emotion scores are stored as analyzed. Notes without
+        scores keep a 'pending' status and are queued for the background
+        worker, like notes saved through queue_session_note.
+
+        Args:
+            notes: List of dicts with patient_id, therapist_id, timestamp,
+                   note_text, emotions, and optionally emotion_windows and
+                   sentence_emotions
+
+        Returns:
+            List of the new note IDs, in the order of `notes`
+        """
+        if not notes:
+            return []
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # Holding the write lock keeps the new ids consecutive and ours alone
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("SELECT IFNULL(MAX(id), 0) FROM session_notes")
+            previous_max_id = cursor.fetchone()[0]
+
+            cursor.executemany(
+                """INSERT INTO session_notes
+                       (patient_id, therapist_id, note_text, emotions, emotion_windows, sentence_emotions,
+                        emotion_status, timestamp)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(note['patient_id'], note['therapist_id'], note['note_text'], json.dumps(note['emotions']),
+                  json.dumps(note['emotion_windows']) if note.get('emotion_windows') else None,
+                  json.dumps(note['sentence_emotions']) if note.get('sentence_emotions') else None,
+                  'done' if note['emotions'] else 'pending', note['timestamp'])
+                 for note in notes]
+            )
+
+            cursor.execute("SELECT id FROM session_notes WHERE id > ? ORDER BY id", (previous_max_id,))
+            note_ids = [row['id'] for row in cursor.fetchall()]
+
+            self._store_note_emotions(
+                cursor, [(note_id, note['emotions']) for note_id, note in zip(note_ids, notes) if note['emotions']]
+            )
+            cursor.executemany(
+                "INSERT INTO scoring_jobs (note_id, available_at) VALUES (?, ?)",
+                [(note_id, time.time()) for note_id, note in zip(note_ids, notes) if not note['emotions']]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        return note_ids
+
+    def claim_scoring_jobs(self, limit, lease_seconds):
+        """Claim up to `limit` queued jobs for scoring.
+
+        Pending jobs whose retry delay has passed are claimed, as are running
+        jobs whose lease expired because their worker died or the app restarted.
+        Returns a list of dicts with job id, note id, attempt count and note text.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        now = time.time()
+
+        # Take the write lock before reading so two workers never claim the same job
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(
+                """SELECT j.id, j.note_id, j.attempts, n.note_text
+                   FROM scoring_jobs j JOIN session_notes n ON n.id = j.note_id
+                   WHERE (j.status = 'pending' AND j.available_at <= ?)
+                      OR (j.status = 'running' AND j.lease_expires_at <= ?)
+                   ORDER BY j.id
+                   LIMIT ?""",
+                (now, now, limit)
+            )
+            jobs = [dict(job) for job in cursor.fetchall()]
+
+            cursor.executemany(
+                """UPDATE scoring_jobs
+                   SET status = 'running', attempts = attempts + 1, lease_expires_at = ?
+                   WHERE id = ?""",
+                [(now + lease_seconds, job['id']) for job in jobs]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        for job in jobs:
+            job['attempts'] += 1
+        return jobs
+
+    def complete_scoring_job(self, job_id, note_id, emotions, emotion_windows=None, sentence_emotions=None):
+        """Store the emotion analysis for a queued note and remove its job."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # Roll back on failure so the worker's long-lived connection isn't left inside a transaction
+        try:
+            cursor.execute(
+                """UPDATE session_notes
+                   SET emotions = ?, emotion_windows = ?, sentence_emotions = ?, emotion_status = 'done'
+                   WHERE id = ?""",
+                (json.dumps(emotions), json.dumps(emotion_windows) if emotion_windows else None,
+                 json.dumps(sentence_emotions) if sentence_emotions else None, note_id)
+            )
+            self._store_note_emotions(cursor, [(note_id, emotions)])
+            cursor.execute("DELETE FROM scoring_jobs WHERE id = ?", (job_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def fail_scoring_job(self, job_id, note_id, attempts, error, max_attempts, retry_delay):
+        """Record a failed scoring attempt, scheduling a retry until max_attempts is reached."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            if attempts >= max_attempts:
+                cursor.execute(
+                    "UPDATE scoring_jobs SET status = 'failed', last_error = ?, lease_expires_at = NULL WHERE id = ?",
+                    (error, job_id)
+                )
+                cursor.execute("UPDATE session_notes SET emotion_status = 'failed' WHERE id = ?", (note_id,))
+            else:
+                # Back off exponentially between retries
+                cursor.execute(
+                    """UPDATE scoring_jobs
+                       SET status = 'pending', last_error = ?, available_at = ?, lease_expires_at = NULL
+                       WHERE id = ?""",
+                    (error, time.time() + retry_delay * 2 ** (attempts - 1), job_id)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def retry_failed_scoring(self, patient_id, therapist_id):
+        """Requeue every note of a patient whose emotion analysis failed."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """UPDATE scoring_jobs SET status = 'pending', attempts = 0, available_at = ?
+               WHERE status = 'failed' AND note_id IN (
+                   SELECT id FROM session_notes WHERE patient_id = ? AND therapist_id = ?)""",
+            (time.time(), patient_id, therapist_id)
+        )
+        cursor.execute(
+            """UPDATE session_notes SET emotion_status = 'pending'
+               WHERE patient_id = ? AND therapist_id = ? AND emotion_status = 'failed'""",
+            (patient_id, therapist_id)
+        )
+        conn.commit()
+        return cursor.rowcount
+
+    def count_pending_notes(self, patient_id, therapist_id):
+        """Count a patient's notes that are still waiting for emotion analysis."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT COUNT(*) FROM session_notes
+               WHERE patient_id = ? AND therapist_id = ? AND emotion_status = 'pending'""",
+            (patient_id, therapist_id)
+        )
+        return cursor.fetchone()[0]
+
+    def iter_session_note_chunks(self, chunk_size=500, after_id=0):
+        """Yield lists of {'id', 'note_text'} dicts in id order, one chunk per query.
+
+        Uses keyset pagination on the primary key, so each chunk costs the same
+        no matter how far into the table it is, and no cursor stays open
+        between chunks.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        while True:
+            cursor.execute(
+                "SELECT id, note_text FROM session_notes WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, chunk_size)
+            )
+            chunk = [dict(note) for note in cursor.fetchall()]
+            if not chunk:
+                return
+            yield chunk
+            after_id = chunk[-1]['id']
+
+    def update_note_emotions_batch(self, results):
+        """Store new emotion analysis for many notes in a single transaction.
+
+        Args:
+            results: List of (note_id, emotions, emotion_windows, sentence_emotions) tuples
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.executemany(
+                """UPDATE session_notes
+                   SET emotions = ?, emotion_windows = ?, sentence_emotions = ?, emotion_status = 'done'
+                   WHERE id = ?""",
+                [(json.dumps(emotions), json.dumps(windows) if windows else None,
+                  json.dumps(sentences) if sentences else None, note_id)
+                 for note_id, emotions, windows, sentences in results]
+            )
+            self._store_note_emotions(cursor, [(result[0], result[1]) for result in results])
+            # Rescored notes no longer need their queued jobs
+            cursor.executemany(
+                "DELETE FROM scoring_jobs WHERE note_id = ?",
+                [(result[0],) for result in results]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def get_session_notes(self, patient_id, therapist_id):
+        """Get all session notes for a specific patient, including archived ones."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT * FROM session_notes 
+               WHERE patient_id = ? AND therapist_id = ?
+               ORDER BY timestamp DESC""",
+            (patient_id, therapist_id)
+        )
+        notes = cursor.fetchall()
+
+        # Old history lives in the archive; only attach it if this patient has some
+        if self._get_archive_counts(patient_id, therapist_id) and self._attach_archive():
+            archived = self._get_archived_notes(patient_id, therapist_id)
+            notes = self._merge_note_tiers(notes, archived)
+
+        return [self._decode_note(note) for note in notes]
+
+    def get_session_notes_page(self, patient_id, therapist_id, limit=10, before=None):
+        """Get one page of a patient's session notes, newest first.
+
+        Pages are keyed on (timestamp, id) rather than OFFSET, so every page
+        costs the same however far back the patient's history goes. Pages
+        continue into the archive once the notes still in the main database
+        run out.
+
+        Args:
+            patient_id: ID of the patient
+            therapist_id: ID of the therapist
+            limit: Maximum number of notes to return
+            before: Cursor returned with the previous page, or None for the newest notes
+
+        Returns:
+            Tuple of (notes, cursor). The cursor is None when there are no older notes.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if before is None:
+            cursor.execute(
+                """SELECT * FROM session_notes
+                   WHERE patient_id = ? AND therapist_id = ?
+                   ORDER BY timestamp DESC, id DESC
+                   LIMIT ?""",
+                (patient_id, therapist_id, limit + 1)
+            )
+        else:
+            cursor.execute(
+                """SELECT * FROM session_notes
+                   WHERE patient_id = ? AND therapist_id = ? AND (timestamp, id) < (?, ?)
+                   ORDER BY timestamp DESC, id DESC
+                   LIMIT ?""",
+                (patient_id, therapist_id, before[0], before[1], limit + 1)
+            )
+        # The extra row only tells us whether another page exists
+        notes = cursor.fetchall()
+
+        # Archived notes can only land on this page if the main database ran
+        # short or its last row is no newer than the newest archived note
+        archive_counts = self._get_archive_counts(patient_id, therapist_id)
+        if archive_counts and (len(notes) <= limit or notes[-1]['timestamp'] <= archive_counts['newest_timestamp']):
+            if self._attach_archive():
+                archived = self._get_archived_notes(patient_id, therapist_id, limit + 1, before)
+                notes = self._merge_note_tiers(notes, archived)[:limit + 1]
+
+        notes = [self._decode_note(note) for note in notes]
+        if len(notes) <= limit:
+            return notes, None
+        notes = notes[:limit]
+        return notes, (notes[-1]['timestamp'], notes[-1]['id'])
+
+    def _decode_note(self, note):
+        """Convert a session_notes row to a dict with its JSON columns decoded."""
+        note_dict = dict(note)
+        # Archived note text is stored compressed
+        if isinstance(note_dict['note_text'], bytes):
+            note_dict['note_text'] = zlib.decompress(note_dict['note_text']).decode('utf-8')
+        note_dict['emotions'] = json.loads(note_dict['emotions'])
+        if note_dict.get('emotion_windows'):
+            note_dict['emotion_windows'] = json.loads(note_dict['emotion_windows'])
+        if note_dict.get('sentence_emotions'):
+            note_dict['sentence_emotions'] = json.loads(note_dict['sentence_emotions'])
+        return note_dict
+
+    def _attach_archive(self, create=False):
+        """Attach the archive database to this connection as "archive".
+
+        Args:
+            create: Create the archive file and its table if they don't exist yet
+
+        Returns:
+            False if there is no archive to attach, True otherwise
+        """
+        conn = self.get_connection()
+
+        # Pooled connections keep the archive attached once it was needed
+        if any(row['name'] == 'archive' for row in conn.execute("PRAGMA database_list")):
+            return True
+        if not create and not os.path.exists(self.archive_path):
+            return False
+
+        conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        if create:
+            conn.execute("PRAGMA archive.journal_mode = WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive.archived_notes (
+                id INTEGER PRIMARY KEY,  -- Same id the note had in session_notes
+                patient_id INTEGER NOT NULL,
+                therapist_id INTEGER NOT NULL,
+                note_text BLOB NOT NULL,  -- zlib-compressed UTF-8
+                emotions TEXT NOT NULL,
+                emotion_windows TEXT,
+                sentence_emotions TEXT,
+                emotion_status TEXT NOT NULL,
+                dominant_emotion TEXT,
+                dominant_score REAL,
+                timestamp TIMESTAMP NOT NULL
+            )
+            ''')
+            conn.execute(
+                """CREATE INDEX IF NOT EXISTS archive.idx_archived_notes_patient_timestamp
+                   ON archived_notes (patient_id, therapist_id, timestamp)"""
+            )
+            conn.commit()
+        return True
+
+    def _get_archive_counts(self, patient_id, therapist_id):
+        """Get the number and newest timestamp of a patient's archived notes, or None if there are none."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT note_count, newest_timestamp FROM archived_note_counts
+               WHERE patient_id = ? AND therapist_id = ?""",
+            (patient_id, therapist_id)
+        )
+        counts = cursor.fetchone()
+        return dict(counts) if counts else None
+
+    def _get_archived_notes(self, patient_id, therapist_id, limit=-1, before=None):
+        """Get a patient's archived notes, newest first. The archive must be attached."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if before is None:
+            cursor.execute(
+                f"""SELECT {_NOTE_COLUMNS} FROM archive.archived_notes
+                    WHERE patient_id = ? AND therapist_id = ?
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?""",
+                (patient_id, therapist_id, limit)
+            )
+        else:
+            cursor.execute(
+                f"""SELECT {_NOTE_COLUMNS} FROM archive.archived_notes
+                    WHERE patient_id = ? AND therapist_id = ? AND (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?""",
+                (patient_id, therapist_id, before[0], before[1], limit)
+            )
+        return cursor.fetchall()
+
+    def _merge_note_tiers(self, notes, archived):
+        """Merge note rows from both tiers, newest first.
+
+        A note caught between being copied to the archive and removed from
+        the main database shows up in both; the main database's copy is kept.
+        """
+        merged = sorted(list(notes) + list(archived), key=lambda note: (note['timestamp'], note['id']), reverse=True)
+        seen = set()
+        unique = []
+        for note in merged:
+            if note['id'] not in seen:
+                seen.add(note['id'])
+                unique.append(note)
+        return unique
+
+    def get_emotion_labels(self, patient_id, therapist_id):
+        """Get the sorted list of emotion labels recorded for a patient."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT emotion FROM emotion_rollups
+               WHERE patient_id = ? AND therapist_id = ?
+               ORDER BY emotion""",
+            (patient_id, therapist_id)
+        )
+        return [row['emotion'] for row in cursor.fetchall()]
+
+    def get_emotion_data_version(self, patient_id, therapist_id):
+        """Get the (revision, last note id) pair describing a patient's emotion rows.
+
+        The last note id grows when notes are scored in order; the revision
+        changes whenever rows that were already there change or disappear.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT revision, last_note_id FROM emotion_versions WHERE patient_id = ? AND therapist_id = ?",
+            (patient_id, therapist_id)
+        )
+        row = cursor.fetchone()
+        return (row['revision'], row['last_note_id']) if row else (0, 0)
+
+    def get_emotions_dataframe(self, patient_id, therapist_id, after_note_id=0, until_note_id=None):
+        """Get emotion data as a pandas DataFrame for visualization.
+
+        Returns one row per scored note, ordered by time, with the note's
+        timestamp, dominant emotion and one column per emotion score. The
+        pivot from session_emotions rows to columns happens in SQL.
+
+        Args:
+            patient_id: ID of the patient
+            therapist_id: ID of the therapist
+            after_note_id: Only include notes with a higher id, to fetch appended notes
+            until_note_id: Only include notes up to this id, or None for all
+        """
+        import pandas as pd
+
+        labels = self.get_emotion_labels(patient_id, therapist_id)
+        if not labels:
+            return pd.DataFrame()
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # One conditional aggregate per label pivots the rows into columns
+        quoted_labels = ['"' + label.replace('"', '""') + '"' for label in labels]
+        score_columns = ", ".join(
+            f"MAX(CASE WHEN emotion = ? THEN score END) AS {quoted}" for quoted in quoted_labels
+        )
+        cursor.execute(
+            f"""SELECT timestamp, MAX(CASE WHEN is_dominant THEN emotion END) AS dominant_emotion, {score_columns}
+                FROM session_emotions
+                WHERE patient_id = ? AND therapist_id = ? AND note_id > ? AND note_id <= ?
+                GROUP BY note_id
+                ORDER BY timestamp, note_id""",
+            labels + [patient_id, therapist_id, after_note_id,
+                      until_note_id if until_note_id is not None else sys.maxsize]
+        )
+        columns = [description[0] for description in cursor.description]
+        df = pd.DataFrame([tuple(row) for row in cursor.fetchall()], columns=columns)
+
+        # Convert timestamp strings to datetime objects, and missing scores to NaN
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df[labels] = df[labels].astype(float)
+        return df
+
+    def get_emotion_summary(self, patient_id, therapist_id, emotion):
+        """Get average, maximum, minimum and the two latest scores of one emotion for a patient.
+
+        Reads the patient's rollup row, so the cost doesn't grow with the
+        number of notes.
+        """
+        self._refresh_stale_rollups(patient_id, therapist_id)
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT score_sum / note_count AS average, score_max AS maximum, score_min AS minimum,
+                      note_count AS count, latest_score AS latest, previous_score AS previous
+               FROM emotion_rollups
+               WHERE patient_id = ? AND therapist_id = ? AND emotion = ?""",
+            (patient_id, therapist_id, emotion)
+        )
+        summary = cursor.fetchone()
+        if not summary:
+            return {'average': None, 'maximum': None, 'minimum': None, 'count': 0, 'latest': None, 'previous': None}
+        return dict(summary)
+
+    def get_emotion_buckets(self, patient_id, therapist_id, emotion, period='week'):
+        """Get per-day or per-week totals of one emotion for a patient, oldest first.
+
+        Args:
+            patient_id: ID of the patient
+            therapist_id: ID of the therapist
+            emotion: Emotion label
+            period: 'day' or 'week'
+
+        Returns:
+            List of dicts with the bucket start date, note count, average, minimum and maximum score
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT bucket, note_count, score_sum / note_count AS average, score_min AS minimum,
+                      score_max AS maximum
+               FROM emotion_buckets
+               WHERE patient_id = ? AND therapist_id = ? AND emotion = ? AND period = ?
+               ORDER BY bucket""",
+            (patient_id, therapist_id, emotion, period)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_dominant_emotion_counts(self, patient_id, therapist_id):
+        """Get how many of a patient's notes each emotion dominated, most frequent first."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT emotion, dominant_count FROM emotion_rollups
+               WHERE patient_id = ? AND therapist_id = ? AND dominant_count > 0
+               ORDER BY dominant_count DESC, emotion""",
+            (patient_id, therapist_id)
+        )
+        return {row['emotion']: row['dominant_count'] for row in cursor.fetchall()}
+
+    def get_caseload_summary(self, therapist_id):
+        """Get every patient of a therapist with an overview of their sessions, in one query.
+
+        Each patient's figures come from index lookups and the rollup tables,
+        so the cost grows with the number of patients, not with their notes.
+
+        Returns:
+            List of patient dicts ordered by name, each with the patient's
+            fields plus 'note_count', 'last_session' (timestamp or None),
+            'latest_emotion', 'analyzed_notes' and 'top_emotion'
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # Archived notes are counted from archived_note_counts; their emotion
+        # rows never leave session_emotions, so the emotions cover both tiers
+        cursor.execute(
+            """SELECT p.*,
+                      (SELECT COUNT(*) FROM session_notes n
+                       WHERE n.patient_id = p.id AND n.therapist_id = p.therapist_id)
+                          + IFNULL(a.note_count, 0) AS note_count,
+                      NULLIF(MAX(IFNULL((SELECT MAX(n.timestamp) FROM session_notes n
+                                         WHERE n.patient_id = p.id AND n.therapist_id = p.therapist_id), ''),
+                                 IFNULL(a.newest_timestamp, '')), '') AS last_session,
+                      (SELECT e.emotion FROM session_emotions e
+                       WHERE e.patient_id = p.id AND e.therapist_id = p.therapist_id AND e.is_dominant = 1
+                       ORDER BY e.timestamp DESC, e.note_id DESC
+                       LIMIT 1) AS latest_emotion,
+                      (SELECT IFNULL(SUM(r.dominant_count), 0) FROM emotion_rollups r
+                       WHERE r.patient_id = p.id AND r.therapist_id = p.therapist_id) AS analyzed_notes,
+                      (SELECT r.emotion FROM emotion_rollups r
+                       WHERE r.patient_id = p.id AND r.therapist_id = p.therapist_id AND r.dominant_count > 0
+                       ORDER BY r.dominant_count DESC, r.emotion
+                       LIMIT 1) AS top_emotion
+               FROM patients p
+               LEFT JOIN archived_note_counts a ON a.patient_id = p.id AND a.therapist_id = p.therapist_id
+               WHERE p.therapist_id = ?
+               ORDER BY p.name""",
+            (therapist_id,)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_therapist_emotion_labels(self, therapist_id=None):
+        """Get the sorted list of emotion labels recorded across a therapist's caseload, or the whole database."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if therapist_id is None:
+            cursor.execute("SELECT DISTINCT emotion FROM emotion_rollups ORDER BY emotion")
+        else:
+            cursor.execute(
+                "SELECT DISTINCT emotion FROM emotion_rollups WHERE therapist_id = ? ORDER BY emotion",
+                (therapist_id,)
+            )
+        return [row['emotion'] for row in cursor.fetchall()]
+
+    def search_notes(self, therapist_id, query, patient_id=None, start_date=None, end_date=None,
+                     dominant_emotion=None, emotion=None, min_score=None, limit=50):
+        """Search a therapist's session notes by text, best matches first.
+
+        Every word in the query must appear in the note; words are matched on
+        their stem, so "worried" also finds "worry". Only notes in the main
+        database are indexed; notes moved by archive_old_notes are not searched.
+
+        Args:
+            therapist_id: ID of the therapist whose caseload is searched
+            query: Words to search for
+            patient_id: Only search this patient's notes
+            start_date: Only include notes on or after this date
+            end_date: Only include notes on or before this date
+            dominant_emotion: Only include notes where this emotion dominated
+            emotion: Together with min_score, only include notes scoring at least min_score on this emotion
+            min_score: Minimum score for `emotion`
+            limit: Maximum number of results
+
+        Returns:
+            List of dicts with note id, patient id and name, timestamp, dominant
+            emotion and score, and a snippet with the matches in bold
+        """
+        words = query.split()
+        if not words:
+            return []
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        use_fts = self.db_path in _search_index_paths
+
+        if use_fts:
+            # Quote each word so punctuation in the query is never read as FTS syntax
+            match = " ".join('"' + word.replace('"', '""') + '"' for word in words)
+            sql = """SELECT n.id, n.patient_id, p.name AS patient_name, n.timestamp, n.dominant_emotion,
+                            n.dominant_score, snippet(session_notes_fts, 0, '**', '**', ' ... ', 16) AS snippet
+                     FROM session_notes_fts
+                     JOIN session_notes n ON n.id = session_notes_fts.rowid
+                     JOIN patients p ON p.id = n.patient_id
+                     WHERE session_notes_fts MATCH ? AND n.therapist_id = ?"""
+            params = [match, therapist_id]
+        else:
+            sql = """SELECT n.id, n.patient_id, p.name AS patient_name, n.timestamp, n.dominant_emotion,
+                            n.dominant_score, substr(n.note_text, 1, 200) AS snippet
+                     FROM session_notes n
+                     JOIN patients p ON p.id = n.patient_id
+                     WHERE n.therapist_id = ?"""
+            params = [therapist_id]
+            for word in words:
+                sql += " AND n.note_text LIKE ? ESCAPE '\\'"
+                params.append("%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+
+        if patient_id is not None:
+            sql += " AND n.patient_id = ?"
+            params.append(patient_id)
+        if start_date is not None:
+            sql += " AND n.timestamp >= ?"
+            params.append(str(start_date))
+        if end_date is not None:
+            # Timestamps carry a time of day, so include everything before the next day
+            sql += " AND n.timestamp < date(?, '+1 day')"
+            params.append(str(end_date))
+        if dominant_emotion:
+            sql += " AND n.dominant_emotion = ?"
+            params.append(dominant_emotion)
+        if emotion and min_score is not None:
+            sql += """ AND EXISTS (SELECT 1 FROM session_emotions e
+                                   WHERE e.note_id = n.id AND e.emotion = ? AND e.score >= ?)"""
+            params.extend([emotion, min_score])
+
+        # bm25() is lower for better matches
+        sql += " ORDER BY bm25(session_notes_fts)" if use_fts else " ORDER BY n.timestamp DESC"
+        sql += " LIMIT ?"
+        params.append(limit)
+
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def iter_session_notes(self, patient_id, therapist_id, chunk_size=500, analyzed_only=False):
+        """Yield a patient's session notes newest first, across both tiers, without loading them all.
+
+        Rows are fetched `chunk_size` at a time from one open cursor, so
+        memory stays constant however many notes the patient has.
+
+        Args:
+            patient_id: ID of the patient
+            therapist_id: ID of the therapist
+            chunk_size: Rows fetched from SQLite at a time
+            analyzed_only: Skip notes that have no emotion analysis yet
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        condition = " AND dominant_emotion IS NOT NULL" if analyzed_only else ""
+        sql = f"""SELECT {_NOTE_COLUMNS} FROM main.session_notes
+                  WHERE patient_id = ? AND therapist_id = ?{condition}"""
+        params = [patient_id, therapist_id]
+        if self._get_archive_counts(patient_id, therapist_id) and self._attach_archive():
+            # Skip archived copies of notes still in the main database after an interrupted archival run
+            sql += f"""
+                  UNION ALL
+                  SELECT {_NOTE_COLUMNS} FROM archive.archived_notes a
+                  WHERE patient_id = ? AND therapist_id = ?{condition}
+                    AND NOT EXISTS (SELECT 1 FROM main.session_notes h WHERE h.id = a.id)"""
+            params += [patient_id, therapist_id]
+        cursor.execute(sql + " ORDER BY timestamp DESC, id DESC", params)
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for row in rows:
+                yield self._decode_note(row)
+
+    def iter_export_batches(self, therapist_id=None, patient_id=None, include_text=True, batch_size=5000):
+        """Yield lists of session notes for a bulk export, ordered by therapist and time.
+
+        Covers one patient, one therapist's caseload or, with neither given,
+        the whole database, across both tiers. Rows are fetched `batch_size`
+        at a time from one open cursor.
+
+        Args:
+            therapist_id: Only export this therapist's notes
+            patient_id: Only export this patient's notes
+            include_text: Include the note text; False leaves 'note_text' as None
+            batch_size: Notes per yielded list
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # Leaving the text out also skips reading and decompressing it
+        columns = _NOTE_COLUMNS if include_text else _NOTE_COLUMNS.replace("note_text", "NULL AS note_text")
+        conditions = []
+        params = []
+        if therapist_id is not None:
+            conditions.append("therapist_id = ?")
+            params.append(therapist_id)
+        if patient_id is not None:
+            conditions.append("patient_id = ?")
+            params.append(patient_id)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+        cursor.execute(f"SELECT 1 FROM archived_note_counts{where} LIMIT 1", params)
+        has_archive = cursor.fetchone() is not None
+
+        sql = f"SELECT {columns} FROM main.session_notes{where}"
+        if has_archive and self._attach_archive():
+            # Skip archived copies of notes still in the main database after an interrupted archival run
+            archive_conditions = conditions + ["NOT EXISTS (SELECT 1 FROM main.session_notes h WHERE h.id = a.id)"]
+            sql += f"""
+                  UNION ALL
+                  SELECT {columns} FROM archive.archived_notes a WHERE {" AND ".join(archive_conditions)}"""
+            params = params * 2
+        cursor.execute(sql + " ORDER BY therapist_id, timestamp, id", params)
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [self._decode_note(row) for row in rows]
+
+    def iter_patient_csv(self, patient_id, therapist_id, chunk_size=500):
+        """Yield a patient's analyzed session notes as CSV text, one chunk per `chunk_size` notes.
+
+        The first chunk starts with the header row, followed by the first
+        notes: date, note, dominant emotion and one score column per emotion
+        recorded for the patient. Chunks are only complete when joined.
+        """
+        labels = self.get_emotion_labels(patient_id, therapist_id)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(['Date', 'Note', 'Dominant Emotion'] + [f"Score: {label}" for label in labels])
+
+        for count, note in enumerate(self.iter_session_notes(patient_id, therapist_id, chunk_size,
+                                                             analyzed_only=True), start=1):
+            emotions = note['emotions']
+            writer.writerow([note['timestamp'], note['note_text'], note['dominant_emotion']] +
+                            [emotions.get(label, '') for label in labels])
+            if count % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def export_patient_data_to_csv(self, patient_id, therapist_id):
+        """Export a patient's analyzed session notes to an in-memory CSV file.
+
+        Nothing is written to disk; the CSV is streamed from the database
+        into the buffer chunk by chunk.
+
+        Returns:
+            Tuple of (filename, BytesIO buffer), or None if the patient doesn't
+            exist or has no analyzed notes
+        """
+        patient = self.get_patient(patient_id, therapist_id)
+        if not patient or not self.get_emotion_labels(patient_id, therapist_id):
+            return None
+
+        output = io.BytesIO()
+        for chunk in self.iter_patient_csv(patient_id, therapist_id):
+            output.write(chunk.encode('utf-8'))
+        output.seek(0)
+
+        # Create a filename with patient name and timestamp
+        safe_name = "".join([c if c.isalnum() else "_" for c in patient['name']])
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{safe_name}_records_{timestamp}.csv", output
+
+    def archive_old_notes(self, older_than_days, batch_size=500):
+        """Move analyzed notes older than `older_than_days` to the archive database.
+
+        Note text is compressed in the archive. Emotion rows and rollups stay
+        in the main database, so trends and summaries are unchanged; archived
+        notes drop out of the search index and are not re-scored by rescore.
+
+        Returns:
+            Number of notes moved
+        """
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+        self._attach_archive(create=True)
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        moved = 0
+        after_id = 0
+        while True:
+            # Notes still waiting for analysis or retry stay until they are done
+            cursor.execute(
+                f"""SELECT {_NOTE_COLUMNS} FROM main.session_notes
+                    WHERE id > ? AND timestamp < ? AND emotion_status = 'done'
+                    ORDER BY id
+                    LIMIT ?""",
+                (after_id, cutoff, batch_size)
+            )
+            notes = cursor.fetchall()
+            if not notes:
+                return moved
+            after_id = notes[-1]['id']
+
+            # Copy and delete in separate transactions. In WAL mode SQLite only
+            # commits each file atomically, so a crash in between must leave a
+            # note in both tiers, never in neither; reads skip the extra copy
+            # and the next run removes it.
+            cursor.executemany(
+                f"""INSERT OR REPLACE INTO archive.archived_notes ({_NOTE_COLUMNS})
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(note['id'], note['patient_id'], note['therapist_id'],
+                  zlib.compress(note['note_text'].encode('utf-8')), note['emotions'], note['emotion_windows'],
+                  note['sentence_emotions'], note['emotion_status'], note['dominant_emotion'],
+                  note['dominant_score'], note['timestamp'])
+                 for note in notes]
+            )
+            conn.commit()
+
+            cursor.executemany(
+                "DELETE FROM main.session_notes WHERE id = ?",
+                [(note['id'],) for note in notes]
+            )
+            # Recount from the archive itself, so the counts also heal after an interrupted run
+            cursor.executemany(
+                """INSERT OR REPLACE INTO main.archived_note_counts
+                       (patient_id, therapist_id, note_count, newest_timestamp)
+                   SELECT patient_id, therapist_id, COUNT(*), MAX(timestamp) FROM archive.archived_notes
+                   WHERE patient_id = ? AND therapist_id = ?
+                   GROUP BY patient_id, therapist_id""",
+                list({(note['patient_id'], note['therapist_id']) for note in notes})
+            )
+            conn.commit()
+            moved += len(notes)
+
+    def close(self):
+        """Return the database connection to the pool."""
+        if self.conn:
+            get_connection_pool(self.db_path).release(self.conn)
             self.conn = None
\ No newline at end of file
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+import streamlit as st
+from utils.config import DATAFRAME_CACHE_MAX_ENTRIES, DATAFRAME_CACHE_MAX_MB
+
+
+class EmotionDataFrameCache:
+    """Process-wide cache of per-patient emotion DataFrames for the trends tab.
+
+    Each entry remembers the (revision, last note id) version it was built
+    from. When only new notes were scored since, just those rows are fetched
+    and appended; when existing rows changed (a note was re-scored or the
+    patient deleted) the frame is rebuilt. Entries are evicted least recently
+    used first, by count and by estimated memory.
+    """
+
+    def __init__(self, max_entries=DATAFRAME_CACHE_MAX_ENTRIES, max_mb=DATAFRAME_CACHE_MAX_MB):
+        self.max_entries = max_entries
+        self.max_bytes = max_mb * 1024 * 1024
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get_dataframe(self, db, patient_id, therapist_id):
+        """Get a patient's emotion DataFrame, reading only what changed since it was cached.
+
+        Returns a copy, so callers in different sessions can't affect each other.
+        """
+        import pandas as pd
+
+        key = (db.db_path, patient_id, therapist_id)
+        revision, last_note_id = db.get_emotion_data_version(patient_id, therapist_id)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+
+        if entry and entry['version'] == (revision, last_note_id):
+            return entry['df'].copy()
+
+        if entry and entry['version'][0] == revision and entry['version'][1] < last_note_id:
+            # Only notes were appended: fetch the new rows and merge them in time order
+            new_rows = db.get_emotions_dataframe(patient_id, therapist_id,
+                                                 after_note_id=entry['version'][1], until_note_id=last_note_id)
+            df = pd.concat([entry['df'], new_rows], ignore_index=True)
+            emotion_columns = sorted(col for col in df.columns if col not in ['timestamp', 'dominant_emotion'])
+            df = df[['timestamp', 'dominant_emotion'] + emotion_columns]
+            df = df.sort_values('timestamp', kind='stable', ignore_index=True)
+        else:
+            df = db.get_emotions_dataframe(patient_id, therapist_id, until_note_id=last_note_id)
+
+        self._store(key, (revision, last_note_id), df)
+        return df.copy()
+
+    def invalidate(self, db_path, patient_id, therapist_id):
+        """Drop the cached frame of one patient."""
+        with self.lock:
+            entry = self.entries.pop((db_path, patient_id, therapist_id), None)
+            if entry:
+                self.total_bytes -= entry['bytes']
+
+    def _store(self, key, version, df):
+        size = int(df.memory_usage(deep=True).sum())
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous:
+                self.total_bytes -= previous['bytes']
+
+            # A frame larger than the whole budget is not worth keeping
+            if size > self.max_bytes:
+                return
+
+            self.entries[key] = {'version': version, 'df': df, 'bytes': size}
+            self.total_bytes += size
+
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted['bytes']
+
+    def stats(self):
+        """Return the number of cached frames and their estimated size in bytes."""
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.total_bytes}
+
+
+@st.cache_resource
+def get_dataframe_cache():
+    """Get the emotion DataFrame cache shared by every session in this process."""
+    return EmotionDataFrameCache()
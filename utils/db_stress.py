@@ -0,0 +1,170 @@
+"""Simulate many concurrent app sessions against one SQLite database.
+
+    python -m utils.db_stress --sessions 32 --reruns 50
+
+Each session is a thread that repeats what a Streamlit rerun does: take a
+pooled Database, read the patient list and notes, sometimes save a note,
+and return the connection. One extra thread drains the scoring queue like
+the background worker. The run reports throughput and every error raised;
+any error, including "database is locked", makes the exit code 1.
+
+Afterwards it checks that a scoring write failing on a locked database
+leaves the worker's connection able to claim and complete the job again.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from utils.config import DATABASE_BUSY_TIMEOUT_MS
+from utils.database import Database
+
+
+def _session(db_path, therapist_id, reruns, write_every, errors, lock):
+    """Run `reruns` simulated page loads for one therapist."""
+    for rerun in range(reruns):
+        db = Database(db_path)
+        try:
+            patients = db.get_patients(therapist_id)
+            patient_id = patients[0]['id'] if patients else db.add_patient(therapist_id, f"Patient {therapist_id}")
+            db.get_session_notes(patient_id, therapist_id)
+            db.count_pending_notes(patient_id, therapist_id)
+
+            if rerun % write_every == 0:
+                db.add_session_note(patient_id, therapist_id, f"Session {rerun}", {'joy': 0.6, 'sadness': 0.4})
+                db.queue_session_note(patient_id, therapist_id, f"Queued session {rerun}")
+        except Exception as e:
+            with lock:
+                errors[f"{type(e).__name__}: {e}"] += 1
+        finally:
+            db.close()
+
+
+def _worker(db_path, stop_event, errors, lock):
+    """Claim and complete queued jobs like the scoring worker, without a model."""
+    db = Database(db_path)
+    try:
+        while not stop_event.is_set():
+            try:
+                for job in db.claim_scoring_jobs(16, 60):
+                    db.complete_scoring_job(job['id'], job['note_id'], {'neutral': 1.0})
+            except Exception as e:
+                with lock:
+                    errors[f"{type(e).__name__}: {e}"] += 1
+            time.sleep(0.01)
+    finally:
+        db.close()
+
+
+def check_locked_write_recovery(db_path):
+    """Fail a scoring write on a locked database and check the connection recovers.
+
+    Returns a list of problems; empty when the job is claimed and completed again.
+    """
+    problems = []
+    db = Database(db_path)
+    conn = db.get_connection()
+    blocker = sqlite3.connect(db_path, timeout=1)
+    try:
+        patient_id = db.add_patient(1, "Lock Check Patient")
+        note_id = db.queue_session_note(patient_id, 1, "Queued while the database is locked")
+        # A zero lease makes the job claimable again straight away
+        job = next(job for job in db.claim_scoring_jobs(100, 0) if job['note_id'] == note_id)
+
+        # Hold the write lock from another connection so completing the job fails
+        conn.execute("PRAGMA busy_timeout = 50")
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            db.complete_scoring_job(job['id'], note_id, {'neutral': 1.0})
+            problems.append("complete_scoring_job succeeded while the database was locked")
+        except sqlite3.OperationalError:
+            pass
+        blocker.rollback()
+
+        if conn.in_transaction:
+            problems.append("a failed complete_scoring_job left a transaction open")
+        else:
+            jobs = db.claim_scoring_jobs(100, 60)
+            job = next((job for job in jobs if job['note_id'] == note_id), None)
+            if job is None:
+                problems.append("the job could not be claimed again after the failed write")
+            else:
+                db.complete_scoring_job(job['id'], note_id, {'neutral': 1.0})
+    except Exception as e:
+        problems.append(f"{type(e).__name__}: {e}")
+    finally:
+        blocker.close()
+        conn.execute(f"PRAGMA busy_timeout = {int(DATABASE_BUSY_TIMEOUT_MS)}")
+        if conn.in_transaction:
+            conn.rollback()
+        db.close()
+    return problems
+
+
+def run_stress(db_path, sessions=32, reruns=50, write_every=5):
+    """Run the simulation and return a summary dict."""
+    errors = Counter()
+    lock = threading.Lock()
+    stop_event = threading.Event()
+
+    worker = threading.Thread(target=_worker, args=(db_path, stop_event, errors, lock))
+    threads = [threading.Thread(target=_session, args=(db_path, therapist_id, reruns, write_every, errors, lock))
+               for therapist_id in range(1, sessions + 1)]
+
+    start = time.perf_counter()
+    worker.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stop_event.set()
+    worker.join()
+
+    return {
+        'sessions': sessions,
+        'reruns': sessions * reruns,
+        'seconds': round(elapsed, 2),
+        'reruns_per_second': round(sessions * reruns / elapsed, 1),
+        'errors': dict(errors),
+        'recovery_problems': check_locked_write_recovery(db_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent sessions against the database.")
+    parser.add_argument("--db", help="Database to use; defaults to a temporary file that is removed afterwards")
+    parser.add_argument("--sessions", type=int, default=32, help="Number of concurrent sessions")
+    parser.add_argument("--reruns", type=int, default=50, help="Page loads per session")
+    parser.add_argument("--write-every", type=int, default=5, help="Save a note every N page loads")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        fd, db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+
+    try:
+        summary = run_stress(db_path, args.sessions, args.reruns, args.write_every)
+    finally:
+        if not args.db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+    print(f"{summary['reruns']} page loads from {summary['sessions']} sessions in {summary['seconds']}s "
+          f"({summary['reruns_per_second']} per second)")
+    for error, count in summary['errors'].items():
+        print(f"{count} x {error}", file=sys.stderr)
+    for problem in summary['recovery_problems']:
+        print(f"Locked write recovery: {problem}", file=sys.stderr)
+    if summary['errors'] or summary['recovery_problems']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,129 +1,643 @@
-from transformers import pipeline
-import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-
-
-# Cache the emotion classifier model to avoid reloading
-@st.cache_resource
-def load_emotion_classifier():
-    """Load and cache the emotion classification model."""
-    try:
-        classifier = pipeline(
-            "text-classification",
-            model="j-hartmann/emotion-english-distilroberta-base",
-            return_all_scores=True
-        )
-        return classifier
-    except Exception as e:
-        st.error(f"Error loading emotion model: {str(e)}")
-        return None
-
-
-def analyze_emotions(text):
-    """Analyze emotions in the given text using the cached model."""
-    if not text:
-        return {}
-
-    classifier = load_emotion_classifier()
-    if not classifier:
-        return {}
-
-    try:
-        result = classifier(text)
-        # Convert to a simple dictionary format
-        emotions = {item['label']: item['score'] for item in result[0]}
-        return emotions
-    except Exception as e:
-        st.error(f"Error analyzing emotions: {str(e)}")
-        return {}
-
-
-def get_emotion_color(emotion):
-    """Return a color code for each emotion for consistent visualization."""
-    colors = {
-        'joy': '#FFD700',  # Gold
-        'sadness': '#1E90FF',  # DodgerBlue
-        'anger': '#FF4500',  # OrangeRed
-        'fear': '#800080',  # Purple
-        'love': '#FF69B4',  # HotPink
-        'surprise': '#00FF7F',  # SpringGreen
-        'disgust': '#A52A2A',  # Brown
-        'neutral': '#A9A9A9'  # DarkGray
-    }
-    return colors.get(emotion, '#808080')  # Default to gray
-
-
-def plot_emotion_bar_chart(emotions_data):
-    """Create a horizontal bar chart of emotions."""
-    if not emotions_data:
-        return None
-
-    # Sort emotions by score in descending order
-    sorted_emotions = dict(sorted(emotions_data.items(), key=lambda item: item[1], reverse=True))
-
-    fig, ax = plt.subplots(figsize=(10, 4))
-
-    emotions = list(sorted_emotions.keys())
-    scores = list(sorted_emotions.values())
-    colors = [get_emotion_color(emotion) for emotion in emotions]
-
-    y_pos = np.arange(len(emotions))
-
-    ax.barh(y_pos, scores, color=colors)
-    ax.set_yticks(y_pos)
-    ax.set_yticklabels(emotions)
-    ax.invert_yaxis()  # Labels read top-to-bottom
-    ax.set_xlabel('Score')
-    ax.set_title('Emotion Analysis')
-
-    # Add score values at the end of each bar
-    for i, v in enumerate(scores):
-        ax.text(v + 0.01, i, f'{v:.2f}', va='center')
-
-    plt.tight_layout()
-    return fig
-
-
-def plot_emotion_trends(df, emotion_type='dominant'):
-    """Plot emotion trends over time.
-
-    Args:
-        df: DataFrame with emotion data
-        emotion_type: Either 'dominant' to show counts of dominant emotions or
-                     a specific emotion name to show its score trend
-    """
-    if df.empty:
-        return None
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-
-    if emotion_type == 'dominant':
-        # Count occurrences of each dominant emotion
-        counts = df['dominant_emotion'].value_counts()
-        labels = counts.index
-        values = counts.values
-        colors = [get_emotion_color(emotion) for emotion in labels]
-
-        ax.bar(labels, values, color=colors)
-        ax.set_xlabel('Emotions')
-        ax.set_ylabel('Count')
-        ax.set_title('Distribution of Dominant Emotions')
-        plt.xticks(rotation=45)
-
-    else:
-        # Plot the trend of a specific emotion's score over time
-        if emotion_type in df.columns:
-            ax.plot(df['timestamp'], df[emotion_type], marker='o',
-                    color=get_emotion_color(emotion_type), linewidth=2)
-            ax.set_xlabel('Date')
-            ax.set_ylabel('Score')
-            ax.set_title(f'Trend of {emotion_type.capitalize()} Over Time')
-            plt.xticks(rotation=45)
-            fig.tight_layout()
-        else:
-            return None
-
-    plt.tight_layout()
-    return fig
\ No newline at end of file
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import streamlit as st
+from utils.config import EMOTION_MODEL, EMOTION_BACKEND, INFERENCE_SERVER_URL, INFERENCE_SERVER_TIMEOUT_SECONDS
+from utils.emotion_cache import EmotionCache
+
+
+MODEL_NAME = EMOTION_MODEL
+DEFAULT_BATCH_SIZE = 8
+
+# Long notes are scored as overlapping windows of at most MAX_MODEL_TOKENS
+MAX_MODEL_TOKENS = 512
+DEFAULT_WINDOW_STRIDE = 128
+CHUNK_REDUCTIONS = ('mean', 'max', 'weighted')
+
+# A sentence starts at a word character and runs to its closing punctuation or line break
+SENTENCE_PATTERN = re.compile(r"[^\s.!?][^.!?\n]*[.!?]*")
+SENTENCE_SCORE_DECIMALS = 3
+
+# After a failed request to the inference server, score in-process for this long before retrying it
+INFERENCE_SERVER_RETRY_SECONDS = 30
+_inference_server_down_until = 0.0
+
+# Backend the configured classifier actually loaded with; set by load_emotion_classifier
+_active_backend = None
+
+# Converted backends must keep every label score within this distance of PyTorch
+PARITY_TOLERANCE = 0.05
+PARITY_SAMPLE_TEXTS = [
+    "I finally feel like things are getting better at home.",
+    "I can't stop worrying that I'll lose my job next week.",
+    "He yelled at me again and I was so angry I left the room.",
+    "Nothing much happened this week, just the usual routine.",
+    "I was shocked when she told me she was moving away.",
+    "The thought of going back there makes me feel sick.",
+    "I miss my mother every single day since she passed.",
+]
+
+
+# Cache the emotion classifier model to avoid reloading
+@st.cache_resource
+def load_emotion_classifier(backend=None):
+    """Load and cache the emotion classification model.
+
+    Args:
+        backend: 'pytorch', 'onnx' or 'onnx-int8'. Defaults to EMOTION_BACKEND.
+                 ONNX backends fall back to PyTorch if they cannot be loaded.
+    """
+    global _active_backend
+
+    # transformers (and torch) are imported here rather than at module level so
+    # pages that never score a note don't pay for them
+    from transformers import pipeline
+
+    backend = backend or EMOTION_BACKEND
+    # Only the configured classifier decides which backend pipeline_settings() reports
+    configured = backend == EMOTION_BACKEND
+    if backend != 'pytorch':
+        try:
+            from utils.onnx_backend import load_onnx_classifier
+            classifier = load_onnx_classifier(MODEL_NAME, quantized=backend == 'onnx-int8')
+            if configured:
+                _active_backend = backend
+            return classifier
+        except Exception as e:
+            st.warning(f"Could not load the '{backend}' emotion backend, using PyTorch instead: {str(e)}")
+
+    try:
+        classifier = pipeline(
+            "text-classification",
+            model=MODEL_NAME,
+            top_k=None
+        )
+        if configured:
+            _active_backend = 'pytorch'
+        return classifier
+    except Exception as e:
+        st.error(f"Error loading emotion model: {str(e)}")
+        return None
+
+
+@st.cache_resource
+def load_emotion_tokenizer():
+    """Load and cache only the tokenizer, used to split notes without loading the model."""
+    from transformers import AutoTokenizer
+
+    try:
+        return AutoTokenizer.from_pretrained(MODEL_NAME)
+    except Exception as e:
+        st.error(f"Error loading emotion tokenizer: {str(e)}")
+        return None
+
+
+def _prewarm_classifier():
+    """Load the classifier and run one text through it so the first real note is fast."""
+    classifier = load_emotion_classifier()
+    if classifier:
+        _score_texts(classifier, ["Warming up the emotion model."], 1)
+
+
+@st.cache_resource
+def start_prewarm():
+    """Load and warm the classifier on a background thread, once per process."""
+    thread = threading.Thread(target=_prewarm_classifier, name="emotion-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_resource
+def get_emotion_cache():
+    """Return the process-wide emotion result cache."""
+    return EmotionCache()
+
+
+def pipeline_settings():
+    """Settings that affect emotion scores. They are part of every cache key.
+
+    The backend is the one the classifier actually loaded with, so scores
+    from a PyTorch fallback are never filed under an ONNX backend. Before
+    the model is loaded it is the configured EMOTION_BACKEND.
+    """
+    return {
+        'model': MODEL_NAME,
+        'backend': _active_backend or EMOTION_BACKEND,
+        'task': 'text-classification',
+        'truncation': True,
+        'max_tokens': MAX_MODEL_TOKENS,
+    }
+
+
+def _token_lengths(classifier, texts):
+    """Return the token count of each text, falling back to character length."""
+    tokenizer = getattr(classifier, 'tokenizer', None)
+    if tokenizer is None:
+        return [len(text) for text in texts]
+
+    encoded = tokenizer(texts, truncation=True, add_special_tokens=False)
+    return [len(ids) for ids in encoded['input_ids']]
+
+
+def _to_emotion_dict(result):
+    """Convert one pipeline result (a list of label/score dicts) to a simple dict."""
+    return {item['label']: item['score'] for item in result}
+
+
+def _score_texts(classifier, texts, batch_size):
+    """Run non-empty texts through a classifier in length-sorted batches.
+
+    Returns a list of emotion dicts in input order (empty for failures) and a
+    list of error messages.
+    """
+    results = [{} for _ in texts]
+
+    # Sort by token length so each batch is padded to a similar length
+    lengths = _token_lengths(classifier, texts)
+    order = [i for _, i in sorted(zip(lengths, range(len(texts))))]
+
+    errors = []
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        try:
+            outputs = classifier([texts[i] for i in batch], batch_size=len(batch), truncation=True)
+        except Exception:
+            # Retry one by one so a single bad input only loses its own result
+            outputs = []
+            for i in batch:
+                try:
+                    outputs.append(classifier([texts[i]], truncation=True)[0])
+                except Exception as e:
+                    outputs.append(None)
+                    errors.append(str(e))
+
+        for i, output in zip(batch, outputs):
+            if output:
+                results[i] = _to_emotion_dict(output)
+
+    return results, errors
+
+
+def _score_remote(texts, batch_size):
+    """Score texts on the shared inference server.
+
+    Returns None when no server is configured, it cannot be reached or it runs
+    different model settings, so the caller can fall back to in-process scoring.
+    """
+    global _inference_server_down_until
+
+    if not INFERENCE_SERVER_URL or time.time() < _inference_server_down_until:
+        return None
+
+    payload = json.dumps({'texts': texts, 'batch_size': batch_size}).encode()
+    request = urllib.request.Request(
+        INFERENCE_SERVER_URL.rstrip("/") + "/analyze",
+        data=payload,
+        headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=INFERENCE_SERVER_TIMEOUT_SECONDS) as response:
+            body = json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        _inference_server_down_until = time.time() + INFERENCE_SERVER_RETRY_SECONDS
+        return None
+
+    # Results from a server running another model would poison the cache
+    if body.get('settings') != pipeline_settings():
+        st.warning("The inference server runs different model settings; scoring in-process instead.")
+        _inference_server_down_until = time.time() + INFERENCE_SERVER_RETRY_SECONDS
+        return None
+
+    return body['results']
+
+
+def analyze_emotions_batch(texts, batch_size=DEFAULT_BATCH_SIZE, use_cache=True, use_server=True):
+    """Analyze emotions for many texts in padded, length-sorted batches.
+
+    Args:
+        texts: List of strings to analyze
+        batch_size: Number of texts sent through the model per forward pass
+        use_cache: Serve previously scored texts from the emotion cache and
+                   store new results in it
+        use_server: Send uncached texts to the shared inference server when
+                    one is configured, falling back to in-process scoring
+
+    Returns:
+        A list of emotion dicts in the same order as ``texts``. Empty texts and
+        texts that fail to analyze get an empty dict, so one bad note does not
+        lose the results for the rest of the batch.
+    """
+    results = [{} for _ in texts]
+    indices = [i for i, text in enumerate(texts) if text]
+    if not indices:
+        return results
+
+    # Serve texts we have already scored with the same settings from the cache
+    keys = {}
+    if use_cache:
+        cache = get_emotion_cache()
+        settings = pipeline_settings()
+        keys = {i: EmotionCache.make_key(texts[i], settings) for i in indices}
+        cached = cache.get_many(list(set(keys.values())))
+        for i in indices:
+            if keys[i] in cached:
+                results[i] = cached[keys[i]]
+        indices = [i for i in indices if not results[i]]
+        if not indices:
+            return results
+
+    scores = _score_remote([texts[i] for i in indices], batch_size) if use_server else None
+    errors = []
+    if scores is None:
+        classifier = load_emotion_classifier()
+        if not classifier:
+            return results
+        scores, errors = _score_texts(classifier, [texts[i] for i in indices], batch_size)
+
+    for i, emotions in zip(indices, scores):
+        results[i] = emotions
+
+    if errors:
+        st.error(f"Error analyzing emotions for {len(errors)} of {len(indices)} texts: {errors[0]}")
+
+    if use_cache:
+        # Loading the model may have fallen back to another backend since the keys were made
+        if pipeline_settings() != settings:
+            settings = pipeline_settings()
+            keys = {i: EmotionCache.make_key(texts[i], settings) for i in indices}
+        cache.put_many({keys[i]: results[i] for i in indices if results[i]})
+
+    return results
+
+
+def analyze_emotions(text):
+    """Analyze emotions in the given text using the cached model."""
+    if not text:
+        return {}
+
+    return analyze_emotions_batch([text])[0]
+
+
+def check_backend_parity(texts=None, backends=('onnx', 'onnx-int8'), tolerance=PARITY_TOLERANCE):
+    """Compare each backend's label scores with the PyTorch reference.
+
+    Returns a dict of backend -> report with the largest absolute score
+    difference seen on any label of any text, and whether it is within
+    ``tolerance``. Backends that fail to load report an error instead.
+    """
+    texts = list(texts or PARITY_SAMPLE_TEXTS)
+    reference_classifier = load_emotion_classifier('pytorch')
+    reference = []
+    if reference_classifier:
+        reference, _ = _score_texts(reference_classifier, texts, DEFAULT_BATCH_SIZE)
+
+    # Without PyTorch scores for every text there is nothing to compare against
+    if not reference or not all(reference):
+        error = "The PyTorch reference backend could not score the sample texts."
+        return {backend: {'ok': False, 'max_abs_diff': None, 'tolerance': tolerance, 'error': error}
+                for backend in backends}
+
+    reports = {}
+    for backend in backends:
+        try:
+            from utils.onnx_backend import load_onnx_classifier
+            classifier = load_onnx_classifier(MODEL_NAME, quantized=backend == 'onnx-int8')
+        except Exception as e:
+            reports[backend] = {'ok': False, 'max_abs_diff': None, 'tolerance': tolerance, 'error': str(e)}
+            continue
+
+        scores, _ = _score_texts(classifier, texts, DEFAULT_BATCH_SIZE)
+        max_diff = max(abs(expected[label] - actual.get(label, 0.0))
+                       for expected, actual in zip(reference, scores)
+                       for label in expected)
+        reports[backend] = {'ok': max_diff <= tolerance, 'max_abs_diff': max_diff, 'tolerance': tolerance}
+
+    return reports
+
+
+def _split_into_windows(tokenizer, text, window_size, stride):
+    """Split text into overlapping windows of at most window_size tokens.
+
+    Returns a list of (window_text, start_token, token_count) tuples. Windows
+    are sliced from the original text using the tokenizer's character offsets
+    so no text is altered by a decode round trip.
+    """
+    encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=tokenizer.is_fast,
+                        verbose=False)
+    ids = encoded['input_ids']
+    if len(ids) <= window_size:
+        return [(text, 0, len(ids))]
+
+    step = max(window_size - stride, 1)
+    windows = []
+    for start in range(0, len(ids), step):
+        end = min(start + window_size, len(ids))
+        if tokenizer.is_fast:
+            offsets = encoded['offset_mapping']
+            window_text = text[offsets[start][0]:offsets[end - 1][1]]
+        else:
+            window_text = tokenizer.decode(ids[start:end])
+        windows.append((window_text, start, end - start))
+        if end == len(ids):
+            break
+    return windows
+
+
+def _reduce_windows(window_scores, reduction):
+    """Aggregate per-window emotion dicts into a single note-level dict."""
+    scored = [(tokens, emotions) for tokens, emotions in window_scores if emotions]
+    if not scored:
+        return {}
+
+    labels = scored[0][1].keys()
+    if reduction == 'max':
+        return {label: max(emotions[label] for _, emotions in scored) for label in labels}
+
+    if reduction == 'weighted':
+        # Longer windows carry more of the note, so weight them by token count
+        total = sum(tokens for tokens, _ in scored)
+        return {label: sum(tokens * emotions[label] for tokens, emotions in scored) / total
+                for label in labels}
+
+    return {label: sum(emotions[label] for _, emotions in scored) / len(scored) for label in labels}
+
+
+def analyze_notes_chunked(texts, reduction='mean', stride=DEFAULT_WINDOW_STRIDE,
+                          batch_size=DEFAULT_BATCH_SIZE, use_cache=True, use_server=True):
+    """Analyze long notes by scoring overlapping token windows in shared batches.
+
+    Every window of every note is scored through a single call to
+    ``analyze_emotions_batch``, so cost grows linearly with note length
+    instead of paying per-call overhead for each window.
+
+    Args:
+        texts: List of note texts to analyze
+        reduction: How window scores are combined: 'mean', 'max' or 'weighted'
+                   (mean weighted by window token count)
+        stride: Number of tokens shared by consecutive windows
+        batch_size: Number of windows sent through the model per forward pass
+        use_cache, use_server: Passed on to ``analyze_emotions_batch``
+
+    Returns:
+        A list of (emotions, windows) tuples in the same order as ``texts``.
+        ``windows`` is a list of dicts with the window's start token, token
+        count and emotion scores.
+    """
+    if reduction not in CHUNK_REDUCTIONS:
+        raise ValueError(f"Unknown reduction '{reduction}'. Use one of: {', '.join(CHUNK_REDUCTIONS)}")
+
+    results = [({}, []) for _ in texts]
+    indices = [i for i, text in enumerate(texts) if text]
+    if not indices:
+        return results
+
+    # Only the tokenizer is needed here; the model may live in the inference server
+    tokenizer = load_emotion_tokenizer()
+    if not tokenizer:
+        return results
+
+    window_size = min(tokenizer.model_max_length, MAX_MODEL_TOKENS) - tokenizer.num_special_tokens_to_add()
+
+    # Flatten all windows of all notes so they share batches
+    note_windows = {i: _split_into_windows(tokenizer, texts[i], window_size, stride) for i in indices}
+    flat = [(i, window) for i in indices for window in note_windows[i]]
+    scores = analyze_emotions_batch([window[0] for _, window in flat], batch_size=batch_size,
+                                    use_cache=use_cache, use_server=use_server)
+
+    per_note = {i: [] for i in indices}
+    for (i, (_, start, tokens)), emotions in zip(flat, scores):
+        per_note[i].append({'start': start, 'tokens': tokens, 'emotions': emotions})
+
+    for i in indices:
+        windows = per_note[i]
+        emotions = _reduce_windows([(w['tokens'], w['emotions']) for w in windows], reduction)
+        results[i] = (emotions, windows)
+
+    return results
+
+
+def analyze_emotions_chunked(text, reduction='mean', stride=DEFAULT_WINDOW_STRIDE,
+                             batch_size=DEFAULT_BATCH_SIZE):
+    """Analyze a single note of any length. Returns (emotions, windows)."""
+    if not text:
+        return {}, []
+
+    return analyze_notes_chunked([text], reduction=reduction, stride=stride, batch_size=batch_size)[0]
+
+
+def split_sentences(text):
+    """Split text into sentences. Returns a list of (sentence, start, end) character spans."""
+    return [(match.group().rstrip(), match.start(), match.start() + len(match.group().rstrip()))
+            for match in SENTENCE_PATTERN.finditer(text or "")]
+
+
+def analyze_sentences_batch(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """Score every sentence of several notes in one batched pass.
+
+    Repeated sentences ("I don't know.", "Okay.") are scored once, and the
+    emotion cache skips sentences seen in earlier notes.
+
+    Returns, for each text, a compact dict (or None for empty text)::
+
+        {'labels': [...], 'spans': [[start, end], ...], 'scores': [[...], ...]}
+
+    where each row of ``scores`` holds one sentence's score per label,
+    rounded to SENTENCE_SCORE_DECIMALS places.
+    """
+    note_sentences = [split_sentences(text) for text in texts]
+    unique = list(dict.fromkeys(sentence for sentences in note_sentences for sentence, _, _ in sentences))
+    scores = dict(zip(unique, analyze_emotions_batch(unique, batch_size=batch_size)))
+
+    results = []
+    for sentences in note_sentences:
+        scored = [(sentence, start, end) for sentence, start, end in sentences if scores.get(sentence)]
+        if not scored:
+            results.append(None)
+            continue
+
+        labels = sorted(scores[scored[0][0]])
+        results.append({
+            'labels': labels,
+            'spans': [[start, end] for _, start, end in scored],
+            'scores': [[round(scores[sentence][label], SENTENCE_SCORE_DECIMALS) for label in labels]
+                       for sentence, _, _ in scored],
+        })
+    return results
+
+
+def analyze_sentences(text, batch_size=DEFAULT_BATCH_SIZE):
+    """Score each sentence of a single note. See analyze_sentences_batch."""
+    return analyze_sentences_batch([text], batch_size=batch_size)[0]
+
+
+def get_emotion_color(emotion):
+    """Return a color code for each emotion for consistent visualization."""
+    colors = {
+        'joy': '#FFD700',  # Gold
+        'sadness': '#1E90FF',  # DodgerBlue
+        'anger': '#FF4500',  # OrangeRed
+        'fear': '#800080',  # Purple
+        'love': '#FF69B4',  # HotPink
+        'surprise': '#00FF7F',  # SpringGreen
+        'disgust': '#A52A2A',  # Brown
+        'neutral': '#A9A9A9'  # DarkGray
+    }
+    return colors.get(emotion, '#808080')  # Default to gray
+
+
+def plot_emotion_bar_chart(emotions_data):
+    """Create a horizontal bar chart of emotions."""
+    if not emotions_data:
+        return None
+
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    # Sort emotions by score in descending order
+    sorted_emotions = dict(sorted(emotions_data.items(), key=lambda item: item[1], reverse=True))
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+
+    emotions = list(sorted_emotions.keys())
+    scores = list(sorted_emotions.values())
+    colors = [get_emotion_color(emotion) for emotion in emotions]
+
+    y_pos = np.arange(len(emotions))
+
+    ax.barh(y_pos, scores, color=colors)
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(emotions)
+    ax.invert_yaxis()  # Labels read top-to-bottom
+    ax.set_xlabel('Score')
+    ax.set_title('Emotion Analysis')
+
+    # Add score values at the end of each bar
+    for i, v in enumerate(scores):
+        ax.text(v + 0.01, i, f'{v:.2f}', va='center')
+
+    plt.tight_layout()
+    return fig
+
+
+def plot_emotion_trends(df, emotion_type='dominant'):
+    """Plot emotion trends over time.
+
+    Args:
+        df: DataFrame with emotion data
+        emotion_type: Either 'dominant' to show counts of dominant emotions or
+                     a specific emotion name to show its score trend
+    """
+    if df.empty:
+        return None
+
+    if emotion_type == 'dominant':
+        # Count occurrences of each dominant emotion
+        return plot_dominant_emotion_counts(df['dominant_emotion'].value_counts().to_dict())
+
+    # Only create a figure that will be returned, so none is left open
+    if emotion_type not in df.columns:
+        return None
+
+    import matplotlib.pyplot as plt
+
+    # Plot the trend of a specific emotion's score over time
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(df['timestamp'], df[emotion_type], marker='o',
+            color=get_emotion_color(emotion_type), linewidth=2)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Score')
+    ax.set_title(f'Trend of {emotion_type.capitalize()} Over Time')
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    return fig
+
+
+def plot_dominant_emotion_counts(counts):
+    """Plot how often each emotion was dominant.
+
+    Args:
+        counts: Dictionary mapping emotion names to the number of notes they dominated
+    """
+    if not counts:
+        return None
+
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+
+    labels = list(counts.keys())
+    values = list(counts.values())
+    colors = [get_emotion_color(emotion) for emotion in labels]
+
+    ax.bar(labels, values, color=colors)
+    ax.set_xlabel('Emotions')
+    ax.set_ylabel('Count')
+    ax.set_title('Distribution of Dominant Emotions')
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    return fig
+
+
+def plot_emotion_bucket_trends(buckets):
+    """Plot the average score of every emotion per day or week, one line each.
+
+    Args:
+        buckets: Dictionary mapping emotion names to bucket lists from Database.get_emotion_buckets
+    """
+    if not any(buckets.values()):
+        return None
+
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    for emotion, emotion_buckets in buckets.items():
+        ax.plot(pd.to_datetime([bucket['bucket'] for bucket in emotion_buckets]),
+                [bucket['average'] for bucket in emotion_buckets],
+                linewidth=1.5, color=get_emotion_color(emotion), label=emotion)
+
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Average Score')
+    ax.set_ylim(0, 1)
+    ax.set_title('Emotion Trends Over Time')
+    ax.legend(loc='upper left', bbox_to_anchor=(1.01, 1), fontsize='small')
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    return fig
+
+
+def plot_sentence_timeline(sentence_emotions):
+    """Plot how each emotion moves from sentence to sentence within a note.
+
+    Args:
+        sentence_emotions: Compact per-sentence scores from analyze_sentences
+    """
+    if not sentence_emotions or len(sentence_emotions['scores']) < 2:
+        return None
+
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    labels = sentence_emotions['labels']
+    scores = np.array(sentence_emotions['scores'])
+    positions = np.arange(1, len(scores) + 1)
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    for column, emotion in enumerate(labels):
+        ax.plot(positions, scores[:, column], marker='o', markersize=3, linewidth=1.5,
+                color=get_emotion_color(emotion), label=emotion)
+
+    ax.set_xlabel('Sentence')
+    ax.set_ylabel('Score')
+    ax.set_ylim(0, 1)
+    ax.set_title('Emotion Timeline Within Session')
+    ax.legend(loc='upper left', bbox_to_anchor=(1.01, 1), fontsize='small')
+
+    plt.tight_layout()
+    return fig
@@ -0,0 +1,148 @@
+import sqlite3
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from utils.config import EMOTION_CACHE_PATH, EMOTION_CACHE_MAX_ENTRIES, EMOTION_CACHE_MEMORY_ENTRIES
+
+
+LOOKUP_CHUNK_SIZE = 500
+
+
+class EmotionCache:
+    """Two-tier cache of emotion scores keyed by note content and model settings.
+
+    An in-process LRU dict sits in front of a SQLite table. Keys hash the
+    normalized text together with the model id and pipeline settings, so
+    changing the model produces new keys and stale scores are never served.
+    """
+
+    def __init__(self, db_path=EMOTION_CACHE_PATH, max_entries=EMOTION_CACHE_MAX_ENTRIES,
+                 memory_entries=EMOTION_CACHE_MEMORY_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # The cache is shared by every session in the process, so allow use across threads
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS emotion_cache (
+            key TEXT PRIMARY KEY,
+            emotions TEXT NOT NULL,  -- JSON string of emotion data
+            last_used REAL NOT NULL
+        )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_emotion_cache_last_used ON emotion_cache(last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(text, settings):
+        """Build a cache key from the normalized text and the pipeline settings."""
+        normalized = " ".join(text.split())
+        payload = json.dumps(settings, sort_keys=True) + "\0" + normalized
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _remember(self, key, emotions):
+        """Store an entry in the in-process LRU tier."""
+        self.memory[key] = emotions
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Return a dict of the cached emotion dicts for the given keys."""
+        found = {}
+        with self.lock:
+            missing = []
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+            # Look up the rest on disk in chunks that stay under SQLite's parameter limit
+            for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+                chunk = missing[start:start + LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self.conn.execute(
+                    f"SELECT key, emotions FROM emotion_cache WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, emotions_json in rows:
+                    found[key] = json.loads(emotions_json)
+                    self._remember(key, found[key])
+
+                # Refresh recency so eviction drops the least recently used entries
+                if rows:
+                    self.conn.execute(
+                        f"UPDATE emotion_cache SET last_used = ? WHERE key IN ({placeholders})",
+                        [time.time()] + chunk
+                    )
+                    self.conn.commit()
+
+                self.disk_hits += len(rows)
+                self.misses += len(chunk) - len(rows)
+
+        return found
+
+    def put_many(self, entries):
+        """Store a dict of key -> emotion dict in both tiers."""
+        if not entries:
+            return
+
+        now = time.time()
+        with self.lock:
+            for key, emotions in entries.items():
+                self._remember(key, emotions)
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO emotion_cache (key, emotions, last_used) VALUES (?, ?, ?)",
+                [(key, json.dumps(emotions), now) for key, emotions in entries.items()]
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used rows once the table exceeds max_entries."""
+        count = self.conn.execute("SELECT COUNT(*) FROM emotion_cache").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                """DELETE FROM emotion_cache WHERE key IN (
+                       SELECT key FROM emotion_cache ORDER BY last_used LIMIT ?)""",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        """Return hit/miss counters and current sizes."""
+        with self.lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM emotion_cache").fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+                'disk_entries': size,
+            }
+
+    def clear(self):
+        """Remove every cached entry and reset the counters."""
+        with self.lock:
+            self.memory.clear()
+            self.conn.execute("DELETE FROM emotion_cache")
+            self.conn.commit()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def close(self):
+        """Close the cache database connection."""
+        with self.lock:
+            self.conn.close()
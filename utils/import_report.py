@@ -0,0 +1,90 @@
+"""Report how long it takes to import the app, for tracking cold-start time.
+
+    python -m utils.import_report --output import_report.json
+
+Imports app.py in a fresh interpreter with ``-X importtime`` and writes a
+JSON report with the total import time, the slowest top-level packages and
+any heavy dependency that got imported even though the login page does not
+need it.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+
+
+# Packages that should only be imported on the code paths that use them
+HEAVY_PACKAGES = ('transformers', 'torch', 'matplotlib', 'fpdf', 'optimum', 'onnxruntime', 'pyarrow')
+
+
+def measure_imports(module="app"):
+    """Import a module in a fresh interpreter.
+
+    Returns the total import time in ms, the cost of each top-level package
+    in ms (the cumulative time of its outermost import), the set of every top-level package imported and the
+    interpreter's exit code.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+
+    # Lines look like: "import time:   self [us] |  cumulative | imported package",
+    # with nested imports indented under the module that triggered them
+    packages = defaultdict(float)
+    imported = set()
+    total_us = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        top_level = name.strip().split(".")[0]
+        imported.add(top_level)
+
+        # The outermost import of a package has the largest cumulative time,
+        # which is what that package costs the app
+        packages[top_level] = max(packages[top_level], int(cumulative) / 1000)
+
+        # Only unindented entries add up to the total without double counting
+        if not name.startswith(" "):
+            total_us += int(cumulative)
+
+    return total_us / 1000, dict(packages), imported, completed.returncode
+
+
+def build_report(module="app", top=15):
+    """Build the import-time report as a dict."""
+    total_ms, packages, imported, returncode = measure_imports(module)
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'module': module,
+        'python': sys.version.split()[0],
+        'returncode': returncode,
+        'total_ms': round(total_ms, 1),
+        'slowest_packages': [{'package': name, 'ms': round(ms, 1)} for name, ms in slowest],
+        'heavy_packages_imported': [name for name in HEAVY_PACKAGES if name in imported],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the MindScribe app.")
+    parser.add_argument("--module", default="app", help="Module to import")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = build_report(args.module)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    # A non-zero exit lets CI flag a heavy dependency creeping back into the login path
+    if report['heavy_packages_imported']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Shared local inference server for the emotion classifier.
+
+    python -m utils.inference_server --port 8765
+
+One process owns the model. Requests arriving from every Streamlit replica
+within a short window are merged into a single batch. Point the app at it
+with MINDSCRIBE_INFERENCE_SERVER_URL=http://127.0.0.1:8765. If the server is
+not running, the app scores in-process as before.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.config import INFERENCE_BATCH_WINDOW_MS, INFERENCE_MAX_BATCH
+from utils.emotion import analyze_emotions_batch, load_emotion_classifier, pipeline_settings, DEFAULT_BATCH_SIZE
+
+
+class MicroBatcher:
+    """Collects texts from concurrent requests and scores them together."""
+
+    def __init__(self, window_ms=INFERENCE_BATCH_WINDOW_MS, max_batch=INFERENCE_MAX_BATCH,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.window_seconds = window_ms / 1000
+        self.max_batch = max_batch
+        self.batch_size = batch_size
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, texts):
+        """Queue texts for the next batch and block until their results are ready."""
+        request = {'texts': texts, 'done': threading.Event(), 'results': None, 'error': None}
+        self.requests.put(request)
+        request['done'].wait()
+        if request['error']:
+            raise RuntimeError(request['error'])
+        return request['results']
+
+    def _collect(self, pending):
+        """Wait for one request, then gather more into `pending` until the window closes or the batch is full."""
+        pending.append(self.requests.get())
+        count = len(pending[0]['texts'])
+        deadline = time.monotonic() + self.window_seconds
+
+        while count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(request)
+            count += len(request['texts'])
+
+    def _run(self):
+        while True:
+            # Filled in place, so a failure part way still reaches every request taken off the queue
+            pending = []
+            try:
+                self._collect(pending)
+                texts = [text for request in pending for text in request['texts']]
+                # Score in-process here; use_server=False keeps the server from calling itself
+                results = analyze_emotions_batch(texts, batch_size=self.batch_size, use_server=False)
+                start = 0
+                for request in pending:
+                    request['results'] = results[start:start + len(request['texts'])]
+                    start += len(request['texts'])
+            except Exception as e:
+                # Fail only this batch; the thread must keep serving later requests
+                for request in pending:
+                    request['error'] = str(e)
+            finally:
+                for request in pending:
+                    request['done'].set()
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """Handles GET /health and POST /analyze."""
+
+    batcher = None
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {'error': "Not found"})
+            return
+        self._send_json(200, {'status': "ok", 'settings': pipeline_settings()})
+
+    def do_POST(self):
+        if self.path != "/analyze":
+            self._send_json(404, {'error': "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            texts = json.loads(self.rfile.read(length))['texts']
+        except (ValueError, KeyError, TypeError):
+            texts = None
+
+        # Checked here so one bad request can't fail the batch it would be merged into
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            self._send_json(400, {'error': "Expected a JSON body with a 'texts' list of strings"})
+            return
+
+        try:
+            results = self.batcher.submit(texts)
+        except RuntimeError as e:
+            self._send_json(500, {'error': str(e)})
+            return
+
+        # The client checks these settings so it never caches scores from a different model
+        self._send_json(200, {'results': results, 'settings': pipeline_settings()})
+
+    def log_message(self, format, *args):
+        # Request logging would print on every note scored
+        pass
+
+
+def serve(host="127.0.0.1", port=8765, window_ms=INFERENCE_BATCH_WINDOW_MS, max_batch=INFERENCE_MAX_BATCH):
+    """Load the model once and serve requests until interrupted."""
+    if load_emotion_classifier() is None:
+        raise SystemExit("Could not load the emotion model.")
+
+    InferenceRequestHandler.batcher = MicroBatcher(window_ms, max_batch)
+    server = ThreadingHTTPServer((host, port), InferenceRequestHandler)
+    print(f"Emotion inference server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the emotion classifier to local app processes.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind; keep it local")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--window-ms", type=float, default=INFERENCE_BATCH_WINDOW_MS,
+                        help="How long to wait for more requests before scoring a batch")
+    parser.add_argument("--max-batch", type=int, default=INFERENCE_MAX_BATCH,
+                        help="Maximum number of texts scored together")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.window_ms, args.max_batch)
+
+
+if __name__ == "__main__":
+    main()
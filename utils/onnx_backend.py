@@ -0,0 +1,74 @@
+import os
+from transformers import AutoTokenizer, pipeline
+from utils.config import ONNX_MODEL_DIR
+
+
+# Emotion classifier backends that can be selected with MINDSCRIBE_EMOTION_BACKEND
+BACKENDS = ('pytorch', 'onnx', 'onnx-int8')
+
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+
+def _export_dir(model_name):
+    """Directory holding the ONNX export of a model."""
+    return os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "--"))
+
+
+def export_onnx_model(model_name):
+    """Export a model to ONNX once and return the directory it was saved to."""
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    export_dir = _export_dir(model_name)
+    if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+    return export_dir
+
+
+def quantize_onnx_model(model_name):
+    """Create a dynamically quantized int8 copy of the ONNX export once and return its directory."""
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    export_dir = export_onnx_model(model_name)
+    quantized_dir = export_dir + "-int8"
+    if not os.path.exists(os.path.join(quantized_dir, QUANTIZED_FILE_NAME)):
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        # Dynamic quantization needs no calibration data and suits CPU-only hosts
+        config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=quantized_dir, quantization_config=config)
+        AutoTokenizer.from_pretrained(export_dir).save_pretrained(quantized_dir)
+    return quantized_dir
+
+
+def load_onnx_classifier(model_name, quantized=False):
+    """Build a text-classification pipeline backed by ONNX Runtime on the CPU.
+
+    Exports (and optionally quantizes) the model on first use. The converted
+    files are kept under ONNX_MODEL_DIR so later processes load them directly.
+    """
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    if quantized:
+        model_dir = quantize_onnx_model(model_name)
+        model = ORTModelForSequenceClassification.from_pretrained(model_dir, file_name=QUANTIZED_FILE_NAME)
+    else:
+        model_dir = export_onnx_model(model_name)
+        model = ORTModelForSequenceClassification.from_pretrained(model_dir)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return pipeline("text-classification", model=model, tokenizer=tokenizer, top_k=None)
+
+
+if __name__ == "__main__":
+    # Convert the models ahead of deployment and report how close each backend is to PyTorch
+    from utils.emotion import check_backend_parity
+
+    for backend, report in check_backend_parity().items():
+        if report.get('error'):
+            print(f"{backend}: could not load backend: {report['error']}")
+        else:
+            status = "OK" if report['ok'] else "FAILED"
+            print(f"{backend}: max abs diff {report['max_abs_diff']:.4f} "
+                  f"(tolerance {report['tolerance']}) {status}")
@@ -0,0 +1,171 @@
+"""Columnar export of session notes and emotion scores for analytics.
+
+    python -m utils.parquet_export --output exports/notes
+    python -m utils.parquet_export --output exports/jsmith --therapist jsmith --no-text
+
+Writes a Parquet dataset partitioned Hive-style by therapist and month, e.g.
+``therapist_id=3/month=2024-05/part-0.parquet``, readable with
+``pyarrow.dataset``, pandas, DuckDB or Spark. Each file has typed columns:
+note id, patient id, timestamp, analysis status, dominant emotion and score,
+one float column per emotion and, unless left out, the note text. Notes are
+streamed from the database and written one row group at a time, so memory
+is bounded by the row group size.
+
+Requires pyarrow, which the app itself doesn't need (pip install pyarrow).
+"""
+import argparse
+import os
+from utils.database import Database
+
+
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+
+def _build_schema(pa, labels, include_text):
+    """Columns of every file. Therapist and month are in the partition path, not the files."""
+    fields = [
+        ('note_id', pa.int64()),
+        ('patient_id', pa.int64()),
+        ('timestamp', pa.timestamp('s')),
+        ('emotion_status', pa.string()),
+        ('dominant_emotion', pa.string()),
+        ('dominant_score', pa.float64()),
+    ]
+    if include_text:
+        fields.append(('note_text', pa.string()))
+    fields += [(f"score_{label}", pa.float64()) for label in labels]
+    return pa.schema(fields)
+
+
+def _to_table(pa, pc, schema, notes, labels, include_text):
+    """Convert a list of note dicts to an Arrow table with the export schema."""
+    columns = {
+        'note_id': [note['id'] for note in notes],
+        'patient_id': [note['patient_id'] for note in notes],
+        # Parsed in Arrow rather than row by row in Python
+        'timestamp': pc.strptime(pa.array([note['timestamp'] for note in notes]),
+                                 format="%Y-%m-%d %H:%M:%S", unit='s'),
+        'emotion_status': [note['emotion_status'] for note in notes],
+        'dominant_emotion': [note['dominant_emotion'] for note in notes],
+        'dominant_score': [note['dominant_score'] for note in notes],
+    }
+    if include_text:
+        columns['note_text'] = [note['note_text'] for note in notes]
+    for label in labels:
+        columns[f"score_{label}"] = [note['emotions'].get(label) for note in notes]
+    return pa.table(columns, schema=schema)
+
+
+def export_parquet(db, output_dir, therapist_id=None, patient_id=None, include_text=True,
+                   row_group_size=DEFAULT_ROW_GROUP_SIZE, progress_callback=None):
+    """Export session notes to a Parquet dataset partitioned by therapist and month.
+
+    Args:
+        db: Database instance
+        output_dir: Directory to write the dataset to; must be empty or not exist
+        therapist_id: Only export this therapist's notes
+        patient_id: Only export this patient's notes; requires therapist_id
+        include_text: Include the note text; False gives a de-identified export
+        row_group_size: Notes per Parquet row group
+        progress_callback: Called with the summary dict after every row group
+
+    Returns:
+        Summary dict with the number of notes, files and row groups written
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    # Patient ids are only meaningful within a therapist's caseload
+    if patient_id is not None and therapist_id is None:
+        raise ValueError("patient_id requires therapist_id")
+
+    if os.path.isdir(output_dir) and os.listdir(output_dir):
+        raise ValueError(f"Output directory '{output_dir}' is not empty")
+
+    if patient_id is not None:
+        labels = db.get_emotion_labels(patient_id, therapist_id)
+    else:
+        labels = db.get_therapist_emotion_labels(therapist_id)
+    schema = _build_schema(pa, labels, include_text)
+
+    summary = {'notes': 0, 'files': 0, 'row_groups': 0}
+    writer = None
+    partition = None
+    pending = []
+
+    def flush():
+        if pending:
+            writer.write_table(_to_table(pa, pc, schema, pending, labels, include_text))
+            summary['notes'] += len(pending)
+            summary['row_groups'] += 1
+            pending.clear()
+            if progress_callback:
+                progress_callback(summary)
+
+    try:
+        # Notes arrive ordered by therapist and time, so each partition is written in one go
+        for batch in db.iter_export_batches(therapist_id, patient_id, include_text, row_group_size):
+            for note in batch:
+                note_partition = (note['therapist_id'], note['timestamp'][:7])
+                if note_partition != partition:
+                    flush()
+                    if writer:
+                        writer.close()
+                    partition = note_partition
+                    directory = os.path.join(output_dir, f"therapist_id={partition[0]}", f"month={partition[1]}")
+                    os.makedirs(directory, exist_ok=True)
+                    writer = pq.ParquetWriter(os.path.join(directory, "part-0.parquet"), schema, compression='zstd')
+                    summary['files'] += 1
+
+                pending.append(note)
+                if len(pending) >= row_group_size:
+                    flush()
+        flush()
+    finally:
+        if writer:
+            writer.close()
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export session notes to a partitioned Parquet dataset.")
+    parser.add_argument("--output", required=True, help="Directory to write the dataset to")
+    parser.add_argument("--db", default="database.db", help="Path to the SQLite database")
+    parser.add_argument("--therapist", help="Only export this therapist's notes (username)")
+    parser.add_argument("--patient-id", type=int, help="Only export this patient's notes; requires --therapist")
+    parser.add_argument("--no-text", action="store_true", help="Leave note text out for de-identified analytics")
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE, help="Notes per row group")
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise SystemExit("The Parquet export needs pyarrow: pip install pyarrow")
+
+    if args.patient_id is not None and not args.therapist:
+        parser.error("--patient-id requires --therapist")
+
+    db = Database(args.db)
+    therapist_id = None
+    if args.therapist:
+        therapist = db.get_therapist_by_username(args.therapist)
+        if not therapist:
+            raise SystemExit(f"Unknown therapist '{args.therapist}'")
+        therapist_id = therapist['id']
+
+    try:
+        summary = export_parquet(db, args.output, therapist_id, args.patient_id, not args.no_text,
+                                 args.row_group_size)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    finally:
+        db.close()
+
+    print(f"Wrote {summary['notes']} notes in {summary['row_groups']} row groups "
+          f"to {summary['files']} files under {args.output}")
+
+
+if __name__ == "__main__":
+    main()
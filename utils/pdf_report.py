@@ -0,0 +1,154 @@
+"""PDF report of one patient's sessions and emotional trends."""
+import os
+import tempfile
+from datetime import datetime
+
+
+PAGE_WIDTH = 190  # A4 width minus the default 10mm margins
+
+
+def _pdf_text(text):
+    """Make text printable with the PDF core fonts, which only cover Latin-1."""
+    return str(text).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _add_chart(pdf, png):
+    """Embed a PNG chart across the page width."""
+    # fpdf 1.7 only reads images from files; the image is parsed and copied
+    # into the document right away, so the temporary file can go at once
+    fd, path = tempfile.mkstemp(suffix=".png")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(png)
+        pdf.image(path, w=PAGE_WIDTH)
+    finally:
+        os.remove(path)
+
+
+def _add_summary_table(pdf, db, patient_id, therapist_id, labels):
+    """Add one row of average, minimum, maximum and latest score per emotion."""
+    columns = [("Emotion", 50), ("Average", 35), ("Minimum", 35), ("Maximum", 35), ("Latest", 35)]
+
+    pdf.set_font("Arial", "B", 10)
+    for title, width in columns:
+        pdf.cell(width, 7, title, 1, 0, "C")
+    pdf.ln()
+
+    pdf.set_font("Arial", "", 10)
+    for label in labels:
+        summary = db.get_emotion_summary(patient_id, therapist_id, label)
+        values = [summary['average'], summary['minimum'], summary['maximum'], summary['latest']]
+        pdf.cell(columns[0][1], 6, _pdf_text(label.capitalize()), 1)
+        for (_, width), value in zip(columns[1:], values):
+            pdf.cell(width, 6, f"{value:.2f}" if value is not None else "-", 1, 0, "C")
+        pdf.ln()
+
+
+def build_patient_report(db, patient_id, therapist_id, chart_cache=None):
+    """Build a patient's PDF report in memory.
+
+    The report has the patient's details, a distribution and a weekly trend
+    chart, a table of per-emotion statistics and every session note with its
+    scores on one line. Notes are streamed from the database, and charts
+    come from `chart_cache` when the same data was plotted before.
+
+    Args:
+        db: Database instance
+        patient_id: ID of the patient
+        therapist_id: ID of the therapist
+        chart_cache: ChartCache to use; defaults to the process-wide cache
+
+    Returns:
+        Tuple of (filename, PDF bytes), or None if the patient doesn't exist
+        or has no session notes
+    """
+    patient = db.get_patient(patient_id, therapist_id)
+    if not patient:
+        return None
+
+    newest_notes, _ = db.get_session_notes_page(patient_id, therapist_id, limit=1)
+    if not newest_notes:
+        return None
+
+    # fpdf and matplotlib are only needed when a report is generated
+    from fpdf import FPDF
+    from utils.emotion import plot_dominant_emotion_counts, plot_emotion_bucket_trends
+
+    if chart_cache is None:
+        from utils.chart_cache import get_chart_cache
+        chart_cache = get_chart_cache()
+
+    # Create PDF
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+
+    # Set up PDF
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "MindScribe Patient Report", 0, 1, "C")
+
+    # Patient information
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, _pdf_text(f"Patient: {patient['name']}"), 0, 1)
+
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 8, _pdf_text(f"Age: {patient['age'] if patient['age'] else 'Not provided'}"), 0, 1)
+    pdf.cell(0, 8, _pdf_text(f"Gender: {patient['gender'] if patient['gender'] else 'Not provided'}"), 0, 1)
+    pdf.cell(0, 8, _pdf_text(f"Contact: {patient['contact'] if patient['contact'] else 'Not provided'}"), 0, 1)
+    pdf.cell(0, 8, f"Patient since: {patient['created_at'].split()[0] if patient.get('created_at') else 'Unknown'}", 0, 1)
+
+    # Charts and statistics come from the rollup tables, not from the notes
+    labels = db.get_emotion_labels(patient_id, therapist_id)
+    if labels:
+        pdf.ln(5)
+        pdf.set_font("Arial", "B", 14)
+        pdf.cell(0, 10, "Emotional Overview", 0, 1)
+
+        counts = db.get_dominant_emotion_counts(patient_id, therapist_id)
+        png = chart_cache.get_png('dominant_counts', counts, plot_dominant_emotion_counts)
+        if png:
+            _add_chart(pdf, png)
+
+        weekly = {label: db.get_emotion_buckets(patient_id, therapist_id, label, period='week') for label in labels}
+        png = chart_cache.get_png('weekly_trends', weekly, plot_emotion_bucket_trends)
+        if png:
+            _add_chart(pdf, png)
+
+        pdf.ln(5)
+        _add_summary_table(pdf, db, patient_id, therapist_id, labels)
+
+    # Session notes
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Session Notes", 0, 1)
+
+    # Streamed from one cursor, so memory doesn't grow with the number of notes
+    for note in db.iter_session_notes(patient_id, therapist_id):
+        emotions = note['emotions']
+        heading = f"Session: {note['timestamp']}"
+        if emotions:
+            heading += f"  -  {note['dominant_emotion'].capitalize()} ({note['dominant_score']:.2f})"
+        pdf.set_font("Arial", "B", 11)
+        pdf.cell(0, 7, _pdf_text(heading), 0, 1)
+
+        pdf.set_font("Arial", "", 10)
+        pdf.multi_cell(0, 5, _pdf_text(note['note_text']))
+
+        # All scores on one line, in the same emotion order for every note
+        pdf.set_font("Arial", "I", 9)
+        if emotions:
+            scores = "   ".join(f"{label.capitalize()} {emotions[label]:.2f}" for label in labels if label in emotions)
+        else:
+            scores = "Emotion analysis not available yet."
+        pdf.cell(0, 6, _pdf_text(scores), "B", 1)
+        pdf.ln(2)
+
+    # fpdf 1.7 returns the document as a Latin-1 string, fpdf2 as bytes
+    data = pdf.output(dest='S')
+    if isinstance(data, str):
+        data = data.encode('latin-1')
+
+    # Create a filename with patient name and timestamp
+    safe_name = "".join([c if c.isalnum() else "_" for c in patient['name']])
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{safe_name}_report_{timestamp}.pdf", data
@@ -0,0 +1,127 @@
+"""Check that the Database lookups use an index instead of scanning a table.
+
+    python -m utils.query_plan_report --output query_plans.json
+
+Calls each Database method that runs on a page load or in the scoring
+worker against a fresh temporary database, records the SQL it executes and
+runs ``EXPLAIN QUERY PLAN`` on every statement. Any statement that scans a
+whole table is reported and the exit code is 1, so a schema change that
+drops or bypasses an index is caught before it reaches a large database.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from utils.database import Database
+
+
+# Sample arguments only need the right shape; the plan doesn't depend on the data
+CHECKED_METHODS = [
+    ('get_patients', (1,)),
+    ('get_patient', (1, 1)),
+    ('get_session_notes', (1, 1)),
+    ('get_session_notes_page', (1, 1, 10, ('2025-01-01 00:00:00', 100))),
+    ('count_pending_notes', (1, 1)),
+    ('get_emotion_labels', (1, 1)),
+    ('get_emotion_data_version', (1, 1)),
+    ('get_emotions_dataframe', (1, 1, 0, 100)),
+    ('get_emotion_summary', (1, 1, 'joy')),
+    ('get_dominant_emotion_counts', (1, 1)),
+    ('get_emotion_buckets', (1, 1, 'joy', 'week')),
+    ('get_caseload_summary', (1,)),
+    ('get_therapist_emotion_labels', (1,)),
+    ('search_notes', (1, 'checking plans', 1, '2025-01-01', '2025-12-31', 'joy', 'joy', 0.5)),
+    ('claim_scoring_jobs', (8, 300)),
+    ('retry_failed_scoring', (1, 1)),
+    ('delete_patient', (1, 1)),
+]
+
+
+def _seed(db):
+    """Add scored notes so queries that depend on the data run their full path.
+
+    One of them is old enough to be archived, so the archive queries run too.
+    """
+    patient_id = db.add_patient(1, "Query Plan Check")
+    db.add_session_note(patient_id, 1, "Checking query plans.", {'joy': 0.9, 'sadness': 0.1})
+    db.import_session_notes([{'patient_id': patient_id, 'therapist_id': 1, 'timestamp': '2020-01-01 00:00:00',
+                              'note_text': "Checking archived query plans.", 'emotions': {'joy': 0.8}}])
+    db.archive_old_notes(365)
+
+
+def _full_scans(plan):
+    """Return the plan steps that read a whole table."""
+    # "SCAN t USING INDEX" or "USING COVERING INDEX" still reads every entry of the index.
+    # Scans of a subquery's own result are not table reads, and a virtual table
+    # scan with an index plan is an FTS5 index lookup.
+    return [step for step in plan
+            if step.startswith("SCAN ") and not step.startswith("SCAN (subquery") and "VIRTUAL TABLE INDEX" not in step]
+
+
+def explain_methods(methods=CHECKED_METHODS):
+    """Run each method with SQL tracing and explain every statement it executed.
+
+    Returns a list of dicts with the method name, the statement and its plan steps.
+    """
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    db = Database(db_path)
+    _seed(db)
+
+    conn = db.get_connection()
+    statements = []
+    try:
+        for name, args in methods:
+            executed = []
+            # The trace callback receives the SQL with its parameters bound
+            conn.set_trace_callback(executed.append)
+            getattr(db, name)(*args)
+            conn.set_trace_callback(None)
+
+            for sql in executed:
+                if not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT")):
+                    continue
+                plan = [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+                statements.append({'method': name, 'sql': " ".join(sql.split()), 'plan': plan})
+    finally:
+        db.close()
+        os.remove(db_path)
+        if os.path.exists(db.archive_path):
+            os.remove(db.archive_path)
+
+    return statements
+
+
+def build_report(methods=CHECKED_METHODS):
+    """Build the query plan report as a dict."""
+    statements = explain_methods(methods)
+    full_scans = [statement for statement in statements if _full_scans(statement['plan'])]
+    return {
+        'python': sys.version.split()[0],
+        'statements': statements,
+        'full_scans': full_scans,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that Database queries use indexes.")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = build_report()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    # A non-zero exit lets CI flag a query that stopped using its index
+    if report['full_scans']:
+        for statement in report['full_scans']:
+            print(f"Full table scan in {statement['method']}: {statement['sql']}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Re-score every session note with the current emotion model.
+
+Run after upgrading the model or changing its settings:
+
+    python -m utils.rescore --workers 4
+
+Notes are streamed out of the database in keyset-paginated chunks, scored
+across a process pool and written back one transaction per chunk. Progress
+is checkpointed after every chunk, so an interrupted run picks up where it
+stopped when started again. Notes moved to the archive by utils.archive
+keep the scores they were archived with.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from utils.database import Database
+
+
+DEFAULT_CHECKPOINT = "rescore_checkpoint.json"
+
+
+def _init_worker(threads_per_worker):
+    """Limit each worker's torch threads and load the model once per process."""
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    from utils.emotion import load_emotion_classifier
+    load_emotion_classifier()
+
+
+def _score_chunk(chunk, batch_size):
+    """Score one chunk of notes. Runs in a worker process."""
+    from utils.emotion import analyze_notes_chunked, analyze_sentences_batch
+
+    texts = [note['note_text'] for note in chunk]
+    results = analyze_notes_chunked(texts, batch_size=batch_size)
+    sentences = analyze_sentences_batch(texts, batch_size=batch_size)
+    return [(note['id'], emotions, windows if len(windows) > 1 else None, sentence_emotions)
+            for note, (emotions, windows), sentence_emotions in zip(chunk, results, sentences)]
+
+
+def load_checkpoint(path, settings):
+    """Return the last note id written by a previous run with the same model settings."""
+    if not os.path.exists(path):
+        return 0, 0
+
+    with open(path) as f:
+        checkpoint = json.load(f)
+
+    # A checkpoint from a different model or settings belongs to another upgrade
+    if checkpoint.get('settings') != settings:
+        return 0, 0
+    return checkpoint['last_note_id'], checkpoint.get('scored', 0)
+
+
+def save_checkpoint(path, settings, last_note_id, scored):
+    """Atomically record how far the run has progressed."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'settings': settings, 'last_note_id': last_note_id, 'scored': scored}, f)
+    os.replace(tmp_path, path)
+
+
+def rescore_notes(db_path="database.db", workers=2, chunk_size=64, batch_size=16,
+                  threads_per_worker=1, checkpoint_path=DEFAULT_CHECKPOINT, restart=False):
+    """Re-score all session notes, resuming from the checkpoint unless restart is set.
+
+    Returns a dict with the number of notes scored, failures, elapsed seconds
+    and throughput in notes per second.
+    """
+    from utils.emotion import pipeline_settings
+
+    # Spawn keeps the workers free of the parent's open SQLite connection
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+        # Ask a worker, which has loaded the model, so a backend that fell back to PyTorch is recorded as such
+        settings = pool.apply(pipeline_settings)
+        last_id, previously_scored = (0, 0) if restart else load_checkpoint(checkpoint_path, settings)
+        if last_id:
+            print(f"Resuming after note {last_id} ({previously_scored} notes scored previously)")
+
+        db = Database(db_path)
+        chunks = db.iter_session_note_chunks(chunk_size, after_id=last_id)
+        scored = failed = 0
+        start = time.time()
+
+        # Keep a bounded number of chunks in flight and write them back in order,
+        # so the checkpoint always marks a fully written prefix of the table
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.apply_async(_score_chunk, (chunk, batch_size)))
+            if len(in_flight) < workers * 2:
+                continue
+            scored, failed = _write_next(db, in_flight, settings, checkpoint_path,
+                                         previously_scored, scored, failed, start)
+
+        while in_flight:
+            scored, failed = _write_next(db, in_flight, settings, checkpoint_path,
+                                         previously_scored, scored, failed, start)
+
+    db.close()
+    elapsed = time.time() - start
+    return {
+        'scored': scored,
+        'failed': failed,
+        'seconds': elapsed,
+        'notes_per_second': scored / elapsed if elapsed else 0.0,
+    }
+
+
+def _write_next(db, in_flight, settings, checkpoint_path, previously_scored, scored, failed, start):
+    """Wait for the oldest chunk in flight, write its results and advance the checkpoint."""
+    results = in_flight.popleft().get()
+
+    # Notes that failed to score keep their previous emotions
+    successes = [result for result in results if result[1]]
+    db.update_note_emotions_batch(successes)
+
+    scored += len(successes)
+    failed += len(results) - len(successes)
+    save_checkpoint(checkpoint_path, settings, results[-1][0], previously_scored + scored)
+
+    elapsed = time.time() - start
+    rate = scored / elapsed if elapsed else 0.0
+    print(f"Scored {scored} notes ({failed} failed) up to note {results[-1][0]} - {rate:.1f} notes/s")
+    return scored, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score all session notes with the current emotion model.")
+    parser.add_argument("--db", default="database.db", help="Path to the SQLite database")
+    parser.add_argument("--workers", type=int, default=2, help="Number of scoring processes")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Notes read and written per transaction")
+    parser.add_argument("--batch-size", type=int, default=16, help="Texts per model forward pass")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Torch threads in each process")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first note")
+    args = parser.parse_args()
+
+    summary = rescore_notes(args.db, args.workers, args.chunk_size, args.batch_size,
+                            args.threads_per_worker, args.checkpoint, args.restart)
+    print(f"Done: {summary['scored']} notes scored, {summary['failed']} failed in "
+          f"{summary['seconds']:.1f}s ({summary['notes_per_second']:.1f} notes/s)")
+
+
+if __name__ == "__main__":
+    main()
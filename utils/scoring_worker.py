@@ -0,0 +1,87 @@
+import threading
+import streamlit as st
+from utils.database import Database
+from utils.config import (SCORING_BATCH_SIZE, SCORING_POLL_SECONDS, SCORING_LEASE_SECONDS,
+                          SCORING_MAX_ATTEMPTS, SCORING_RETRY_DELAY_SECONDS)
+
+
+class ScoringWorker(threading.Thread):
+    """Background thread that drains the scoring_jobs queue.
+
+    Jobs live in SQLite, so anything queued before a restart is picked up
+    again: pending jobs are claimed directly and jobs that were running when
+    the process died are reclaimed once their lease expires.
+    """
+
+    def __init__(self, db_path, batch_size=SCORING_BATCH_SIZE, poll_seconds=SCORING_POLL_SECONDS):
+        super().__init__(name="emotion-scoring-worker", daemon=True)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+
+    def notify(self):
+        """Wake the worker so a newly queued note is scored without waiting for the next poll."""
+        self.wake_event.set()
+
+    def stop(self):
+        """Ask the worker to exit after its current batch."""
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def run(self):
+        # Hold one pooled connection for the life of the worker
+        db = Database(self.db_path)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    claimed = self.process_batch(db)
+                except Exception:
+                    # For example the database was briefly locked; make sure no transaction is
+                    # left open on the worker's connection, then try again on the next poll
+                    db.get_connection().rollback()
+                    claimed = 0
+
+                if not claimed:
+                    self.wake_event.wait(self.poll_seconds)
+                    self.wake_event.clear()
+        finally:
+            db.close()
+
+    def process_batch(self, db):
+        """Score one batch of queued notes. Returns the number of jobs claimed."""
+        jobs = db.claim_scoring_jobs(self.batch_size, SCORING_LEASE_SECONDS)
+        if not jobs:
+            return 0
+
+        from utils.emotion import analyze_notes_chunked, analyze_sentences_batch
+
+        texts = [job['note_text'] for job in jobs]
+        try:
+            results = analyze_notes_chunked(texts, batch_size=self.batch_size)
+            sentences = analyze_sentences_batch(texts, batch_size=self.batch_size)
+        except Exception as e:
+            results = [({}, []) for _ in jobs]
+            sentences = [None for _ in jobs]
+            error = str(e)
+        else:
+            error = "Emotion analysis returned no scores."
+
+        for job, (emotions, windows), sentence_emotions in zip(jobs, results, sentences):
+            if emotions:
+                db.complete_scoring_job(job['id'], job['note_id'], emotions,
+                                        windows if len(windows) > 1 else None, sentence_emotions)
+            else:
+                db.fail_scoring_job(job['id'], job['note_id'], job['attempts'], error,
+                                    SCORING_MAX_ATTEMPTS, SCORING_RETRY_DELAY_SECONDS)
+
+        return len(jobs)
+
+
+@st.cache_resource
+def start_scoring_worker(db_path="database.db"):
+    """Start the background scoring worker once per process and return it."""
+    worker = ScoringWorker(db_path)
+    worker.start()
+    return worker